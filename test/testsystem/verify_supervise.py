@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""Verify that util/test/supervise.py gives each child its own output and
+time when children are started from many threads at once, as they are when
+sub_test runs tests in parallel or compiles ahead of executing.
+"""
+
+from __future__ import print_function
+
+import os
+import os.path
+import sys
+import threading
+import time
+import unittest
+
+# Add the util/test dir to the python path.
+util_test_dir = os.path.join(os.path.dirname(__file__), '../../util/test')
+sys.path.insert(0, os.path.abspath(util_test_dir))
+
+import supervise
+
+
+class SuperviseTests(unittest.TestCase):
+
+    slow_seconds = 3
+
+    def run_children(self, commands):
+        """Start a child for each command on its own thread, all at once, and
+        return the (seconds, output) of each.
+        """
+        supervisor = supervise.Supervisor()
+        results = [None] * len(commands)
+
+        def run(i):
+            start = time.time()
+            child = supervisor.run(supervise.popen(commands[i]), 60, 1)
+            results[i] = (time.time() - start, child.output)
+
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(len(commands))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_fast_child_next_to_slow__output(self):
+        """Verify a fast child is done long before slow children started
+        next to it, and gets only its own output."""
+        commands = []
+        for i in range(100):
+            if i % 2:
+                commands.append(['sleep', str(self.slow_seconds)])
+            else:
+                commands.append(['echo', str(i)])
+        results = self.run_children(commands)
+        for (i, (seconds, output)) in enumerate(results):
+            if i % 2:
+                self.assertEqual('', output)
+            else:
+                self.assertEqual('{0}\n'.format(i), output)
+                self.assertLess(seconds, self.slow_seconds / 2.0)
+
+    def test_slow_child__timeout(self):
+        """Verify a child that runs past its timeout is killed and reaped,
+        while a fast child next to it is not held up."""
+        supervisor = supervise.Supervisor()
+        slow = supervisor.start(
+            supervise.popen(['sleep', str(self.slow_seconds * 10)]), 1, 1)
+        start = time.time()
+        fast = supervisor.run(supervise.popen(['echo', 'fast']), 60, 1)
+        self.assertLess(time.time() - start, self.slow_seconds / 2.0)
+        self.assertEqual('fast\n', fast.output)
+        slow.wait()
+        self.assertTrue(slow.timed_out)
+        self.assertEqual(supervise.TIMEOUT_STATUS, slow.status)
+        self.assertIsNotNone(slow.process.returncode)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+"""A snapshot of the Chapel configuration, taken once by start_test.
+
+Working out the configuration means running printchplenv and compileline,
+which probe compilers and the machine. start_test does that once, writes
+the results to a JSON file and exports its name in $CHPL_TEST_CHPLENV, and
+sub_test, testEnv and skipif evaluation read the file instead of probing
+again for every directory and skipif file.
+
+The snapshot records the environment variables it was taken with. It is
+ignored by a process whose environment sets any of them differently, for
+instance a test directory that overrides a CHPL_* setting.
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import subprocess
+
+ENV_VAR = 'CHPL_TEST_CHPLENV'
+
+
+def printchplenv(util_dir, mode):
+    """Run printchplenv and return the settings it prints.
+
+    :type util_dir: str
+    :arg util_dir: the util/ directory holding printchplenv
+
+    :type mode: str
+    :arg mode: --sh or --simple
+
+    :rtype: dict
+    :returns: CHPL_* variable names and values
+    """
+    output = subprocess.check_output(
+        [os.path.join(util_dir, 'printchplenv'), mode], close_fds=True)
+    settings = {}
+    for line in output.splitlines():
+        (key, _, value) = line.replace('export ', '', 1).partition('=')
+        # --sh quotes values
+        if len(value) > 2 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        settings[key.strip()] = value
+    return settings
+
+
+def take(util_dir, chpl_home, target_platform):
+    """Work out the Chapel configuration.
+
+    :type util_dir: str
+    :arg util_dir: the util/ directory holding printchplenv
+
+    :type chpl_home: str
+    :arg chpl_home: CHPL_HOME, whose compileline is used
+
+    :type target_platform: str
+    :arg target_platform: CHPL_TARGET_PLATFORM
+
+    :rtype: dict
+    :returns: the snapshot
+    """
+    sh = printchplenv(util_dir, '--sh')
+    simple = printchplenv(util_dir, '--simple')
+
+    # sub_test reports a missing C compiler itself
+    compileline = os.path.join(chpl_home, 'util', 'config', 'compileline')
+    p = subprocess.Popen([compileline, '--compile'],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=True)
+    c_compiler = p.communicate()[0].rstrip()
+    if p.returncode != 0:
+        c_compiler = None
+
+    names = set(sh) | set(simple)
+    return {
+        'environment': dict((k, os.environ.get(k)) for k in names),
+        'printchplenv --sh': sh,
+        'printchplenv --simple': simple,
+        'c_compiler': c_compiler,
+        'target_platform': target_platform,
+    }
+
+
+def save(snapshot, filename):
+    """Write a snapshot and export its name to child processes."""
+    with open(filename, 'w') as fp:
+        json.dump(snapshot, fp, indent=0, sort_keys=True)
+    os.environ[ENV_VAR] = filename
+
+
+def load():
+    """Return the snapshot exported by start_test, or None if there isn't
+    one or it doesn't match the current environment.
+    """
+    filename = os.environ.get(ENV_VAR)
+    if not filename:
+        return None
+    try:
+        with open(filename, 'r') as fp:
+            snapshot = json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+    for (name, value) in snapshot['environment'].items():
+        if os.environ.get(name) != value:
+            return None
+    # JSON strings come back as unicode
+    return _to_str(snapshot)
+
+
+def _to_str(value):
+    if isinstance(value, dict):
+        return dict((_to_str(k), _to_str(v)) for (k, v) in value.items())
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
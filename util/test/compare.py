@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""Compare test output with .good and .bad files without running diff.
+
+Most comparisons match, so files are first compared a block at a time,
+stopping at the first difference. A unified diff is only worked out for
+files that differ. Diffs of large files are left to diff -u, since
+difflib can take a long time on them.
+
+Comparisons against .bad files can ignore the line numbers in messages
+about module code, and the compiler version, the way the
+diff-ignoring-module-line-numbers script does.
+"""
+
+from __future__ import print_function
+
+import difflib
+import os
+import re
+import subprocess
+
+_block_size = 64 * 1024
+
+# files bigger than this, in bytes, are diffed with diff -u
+_max_difflib_size = 4 * 1024 * 1024
+
+# the substitutions diff-ignoring-module-line-numbers makes with sed
+_module_line = re.compile(r':[0-9:]*:')
+_version = re.compile(r'chpl Version [0-9a-f.-]*$')
+_internal_error = re.compile(
+    r'internal error: ([A-Z][A-Z][A-Z])[0-9][0-9][0-9][0-9] chpl Version mmmm')
+
+
+def same_files(f1, f2):
+    """Return whether two files have the same contents.
+
+    :raises IOError: if either file can't be read
+    """
+    if os.path.getsize(f1) != os.path.getsize(f2):
+        return False
+    with open(f1, 'rb') as fp1:
+        with open(f2, 'rb') as fp2:
+            while True:
+                block = fp1.read(_block_size)
+                if block != fp2.read(_block_size):
+                    return False
+                if not block:
+                    return True
+
+
+def diff_files(f1, f2):
+    """Return a unified diff of two files, which is empty if they are the
+    same.
+
+    :raises IOError: if either file can't be read
+    """
+    if same_files(f1, f2):
+        return ''
+    if os.path.getsize(f1) + os.path.getsize(f2) > _max_difflib_size:
+        p = subprocess.Popen(['diff', '-u', f1, f2],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=True)
+        return p.communicate()[0]
+    return unified_diff(_read_lines(f1), _read_lines(f2), f1, f2)
+
+
+def diff_files_ignoring_module_line_numbers(f1, f2):
+    """Return a unified diff of two files, which is empty if they are the
+    same apart from the line numbers of messages about module code and the
+    compiler version.
+
+    :raises IOError: if either file can't be read
+    """
+    lines1 = normalize_module_line_numbers(_read_lines(f1))
+    lines2 = normalize_module_line_numbers(_read_lines(f2))
+    if lines1 == lines2:
+        return ''
+    return unified_diff(lines1, lines2, f1, f2)
+
+
+def normalize_module_line_numbers(lines):
+    """Replace the line numbers in messages about module code, and the
+    compiler version, with placeholders.
+
+    :type lines: list
+    :arg lines: lines, with their line endings
+
+    :rtype: list
+    """
+    normalized = []
+    for line in lines:
+        (text, end) = _split_line_ending(line)
+        if 'CHPL_HOME/modules' in text:
+            text = _module_line.sub(':nnnn:', text, count=1)
+        text = _version.sub('chpl Version mmmm', text, count=1)
+        text = _internal_error.sub(r'internal error: \1nnnn chpl Version mmmm',
+                                   text, count=1)
+        normalized.append(text + end)
+    return normalized
+
+
+def unified_diff(lines1, lines2, name1, name2):
+    """Return a unified diff of two lists of lines, marking a last line
+    without a newline the way diff does.
+    """
+    diff = []
+    for line in difflib.unified_diff(lines1, lines2, name1, name2):
+        diff.append(line)
+        if not line.endswith('\n'):
+            diff.append('\n\\ No newline at end of file\n')
+    return ''.join(diff)
+
+
+def _read_lines(filename):
+    with open(filename, 'rb') as fp:
+        return fp.read().splitlines(True)
+
+
+def _split_line_ending(line):
+    if line.endswith('\n'):
+        return (line[:-1], '\n')
+    return (line, '')
@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+
+"""Cache of compiled tests, so that a test that hasn't changed isn't
+compiled again.
+
+The cache is opt-in: it is used when $CHPL_TEST_COMPILE_CACHE names a
+directory to keep it in (start_test --compile-cache). It lasts across runs,
+so that a correctness run and a performance run, or a run after a change to
+the test system only, can reuse the builds of earlier ones.
+
+Each entry holds the executable, the compiler output and the compiler exit
+status of one compilation. It is keyed by a hash of
+
+    - the compiler command line, less the name of the executable
+    - the Chapel sources, C sources and headers in the test directory
+    - the compiler and the files it reads from $CHPL_HOME (modules/,
+      runtime/include/ and lib/), by size and modification time
+    - the printchplenv settings and the CHPL_* environment
+
+Files that compiler options pull in from other directories aren't part of
+the key, so a change to them isn't noticed.
+
+Once the cache is bigger than $CHPL_TEST_COMPILE_CACHE_SIZE megabytes, the
+entries used least recently are removed. Entries are written to a temporary
+directory and renamed into place, so any number of sub_tests can share one
+cache.
+
+Without a cache, identical compilations during one run, such as repeated
+.compopts lines or a directory tested in more than one pass, still share one
+build through SharedBuilds. Its key is the same as the cache's without the
+compiler fingerprint, which can't change during a run, and the builds are
+kept in $CHPL_TEST_TMP_DIR until the run is over. A compilation whose
+arguments name paths relative to the test directory, such as
+../common.chpl or -M../lib, is only shared within that directory.
+"""
+
+from __future__ import print_function
+
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import skipif
+
+DIR_VAR = 'CHPL_TEST_COMPILE_CACHE'
+SIZE_VAR = 'CHPL_TEST_COMPILE_CACHE_SIZE'
+
+# megabytes
+_default_size = 10240
+
+# files in the test directory that a compilation could read
+_source_suffixes = ('.chpl', '.h', '.c', '.cc', '.cpp', '.o', '.a')
+
+# files of a cache entry, other than the executables
+_output_file = 'output'
+_status_file = 'status'
+
+# an executable can come with a launcher, which is the file named execname
+_executables = ('exe', 'exe_real')
+
+# compiler options that write files other than the executable, which a
+# reused build wouldn't put in place
+_side_output_options = ('--savec', '--library', '--print-passes-file',
+                        '--html')
+
+
+def reusable(args):
+    """Return whether the build of a compilation can stand in for another
+    one, which it can't if the compiler writes files other than the
+    executable.
+
+    :type args: list
+    :arg args: compiler arguments
+    """
+    return not any(arg.startswith(_side_output_options) for arg in args)
+
+
+def source_digest(file_index):
+    """Return a hash of the names and contents of the Chapel sources, C
+    sources and headers in a test directory. Each file is hashed once by the
+    index, so this is cheap to call for every compilation.
+
+    :type file_index: file_index.FileIndex
+    :arg file_index: index of the test directory
+
+    :rtype: str
+    :returns: hex digest, or None if a source can't be read
+    """
+    h = hashlib.sha1()
+    try:
+        for name in sorted(file_index.listdir()):
+            if name.endswith(_source_suffixes) and file_index.isfile(name):
+                h.update('\0file:' + name + '\0' + file_index.digest(name))
+    except (IOError, OSError):
+        return None
+    return h.hexdigest()
+
+
+def from_environment(util_dir):
+    """Return the cache named by $CHPL_TEST_COMPILE_CACHE, or None if it
+    isn't set.
+
+    :type util_dir: str
+    :arg util_dir: the util/ directory holding printchplenv
+    """
+    directory = os.environ.get(DIR_VAR)
+    if not directory:
+        return None
+    megabytes = int(os.environ.get(SIZE_VAR, _default_size))
+    return CompileCache(directory, megabytes * 1024 * 1024, util_dir)
+
+
+class CompileCache(object):
+    """Compilations from this and earlier runs."""
+
+    def __init__(self, directory, max_size, util_dir):
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        self.util_dir = util_dir
+        self.lock = threading.Lock()
+        self.compilers = {}
+        # size of the cache as far as this run knows, or None before it has
+        # looked
+        self.size = None
+
+    def key(self, compiler, args, execname, chpl_home, sources):
+        """Return the cache key of a compilation in the current directory.
+
+        :type compiler: str
+        :arg compiler: compiler executable
+
+        :type args: list
+        :arg args: compiler arguments
+
+        :type execname: str
+        :arg execname: name of the executable the compiler writes
+
+        :type chpl_home: str
+        :arg chpl_home: CHPL_HOME
+
+        :type sources: str
+        :arg sources: what source_digest() returned for the directory
+        """
+        h = hashlib.sha1()
+        h.update(self._compiler_fingerprint(compiler, chpl_home))
+        for arg in args:
+            h.update('\0arg:' + ('<execname>' if arg == execname else arg))
+        h.update('\0sources:' + sources)
+        settings = skipif.chplenv(self.util_dir)
+        for name in sorted(settings):
+            h.update('\0chplenv:{0}={1}'.format(name, settings[name]))
+        h.update('\0' + _environment_fingerprint())
+        return h.hexdigest()
+
+    def get(self, key, execname):
+        """Put a cached executable in place.
+
+        :type key: str
+        :arg key: what key() returned for the compilation
+
+        :type execname: str
+        :arg execname: name to give the executable
+
+        :rtype: tuple
+        :returns: (output, status) of the compiler, or None if the
+                  compilation isn't cached
+        """
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, _output_file), 'rb') as fp:
+                output = fp.read()
+            with open(os.path.join(entry, _status_file), 'r') as fp:
+                status = int(fp.read())
+            for (stored, name) in zip(_executables,
+                                      (execname, execname + '_real')):
+                if os.path.isfile(os.path.join(entry, stored)):
+                    _link_or_copy(os.path.join(entry, stored), name)
+            # remember when the entry was last used, for eviction
+            os.utime(entry, None)
+        except (IOError, OSError, ValueError):
+            # not cached, or removed by another run just now
+            return None
+        return (output, status)
+
+    def put(self, key, execname, output, status):
+        """Remember a compilation done in the current directory.
+
+        :type key: str
+        :arg key: what key() returned for the compilation
+
+        :type execname: str
+        :arg execname: name of the executable the compiler wrote
+
+        :type output: str
+        :arg output: compiler output
+
+        :type status: int
+        :arg status: compiler exit status
+        """
+        entry = self._entry(key)
+        tmp_dir = None
+        added = 0
+        try:
+            if not os.path.isdir(os.path.dirname(entry)):
+                os.makedirs(os.path.dirname(entry))
+            tmp_dir = tempfile.mkdtemp(prefix='.tmp.', dir=self.directory)
+            with open(os.path.join(tmp_dir, _output_file), 'wb') as fp:
+                fp.write(output)
+            with open(os.path.join(tmp_dir, _status_file), 'w') as fp:
+                fp.write(str(status))
+            for (stored, name) in zip(_executables,
+                                      (execname, execname + '_real')):
+                if os.path.isfile(name):
+                    _link_or_copy(name, os.path.join(tmp_dir, stored))
+            added = _entry_size(tmp_dir)
+            os.rename(tmp_dir, entry)
+            tmp_dir = None
+        except (IOError, OSError):
+            # the cache only saves time, so carry on without it; this is
+            # also where a run that stored the same entry first ends up
+            pass
+        finally:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        # the cache is only looked at as a whole once it might be too big
+        with self.lock:
+            if self.size is not None:
+                self.size += added
+                if self.size <= self.max_size:
+                    return
+        self._evict()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _compiler_fingerprint(self, compiler, chpl_home):
+        # the same for every test, so worked out once
+        with self.lock:
+            if compiler not in self.compilers:
+                files = [_which(compiler)]
+                for subdir in ('modules', os.path.join('runtime', 'include'),
+                               'lib'):
+                    for (root, dirs, names) in os.walk(
+                            os.path.join(chpl_home, subdir)):
+                        dirs.sort()
+                        files.extend(os.path.join(root, n)
+                                     for n in sorted(names))
+                h = hashlib.sha1()
+                for name in files:
+                    try:
+                        st = os.stat(name)
+                    except OSError:
+                        continue
+                    h.update('{0}\0{1}\0{2}\0'.format(name, st.st_size,
+                                                      st.st_mtime))
+                self.compilers[compiler] = h.hexdigest()
+            return self.compilers[compiler]
+
+    def _evict(self):
+        # remove the entries used least recently until the cache fits. Other
+        # runs sharing the cache add to it too, so its size is counted again
+        entries = []
+        total = 0
+        for prefix in _listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if prefix.startswith('.') or not os.path.isdir(prefix_dir):
+                continue
+            for key in _listdir(prefix_dir):
+                entry = os.path.join(prefix_dir, key)
+                try:
+                    size = _entry_size(entry)
+                    entries.append((os.path.getmtime(entry), size, entry))
+                except OSError:
+                    continue
+                total += size
+        if total > self.max_size:
+            entries.sort()
+            for (_, size, entry) in entries:
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                if total <= self.max_size:
+                    break
+        with self.lock:
+            self.size = total
+
+
+class SharedBuilds(object):
+    """Compilations done during this run, so that an identical one can reuse
+    the build. They are kept in memory, with the executables linked or
+    copied into a temporary directory that clear() removes.
+    """
+
+    def __init__(self, tmp_dir=None):
+        self.tmp_dir = tmp_dir
+        self.lock = threading.Lock()
+        self.builds = {}
+        self.directory = None
+
+    def key(self, compiler, args, execname, sources):
+        """Return the key of a compilation in the current directory: the
+        sources, the command line, less the name of the executable, and the
+        environment.
+
+        :type compiler: str
+        :arg compiler: compiler executable
+
+        :type args: list
+        :arg args: compiler arguments
+
+        :type execname: str
+        :arg execname: name of the executable the compiler writes
+
+        :type sources: str
+        :arg sources: what source_digest() returned for the directory
+        """
+        if any(_names_other_directory(arg) for arg in [compiler] + args):
+            directory = os.getcwd()
+        else:
+            directory = None
+        env = tuple(sorted((k, v) for (k, v) in os.environ.items()
+                           if k not in ('PWD', 'OLDPWD')))
+        return (sources, directory, compiler,
+                tuple('<execname>' if arg == execname else arg
+                      for arg in args),
+                env)
+
+    def get(self, key, execname):
+        """Put the executable of an identical compilation in place.
+
+        :type key: tuple
+        :arg key: what key() returned for the compilation
+
+        :type execname: str
+        :arg execname: name to give the executable
+
+        :rtype: tuple
+        :returns: (output, status) of the compiler, or None if there was no
+                  identical compilation
+        """
+        with self.lock:
+            build = self.builds.get(key)
+        if build is None:
+            return None
+        (output, status, stored) = build
+        try:
+            for (source, name) in zip(stored,
+                                      (execname, execname + '_real')):
+                if source:
+                    _link_or_copy(source, name)
+        except (IOError, OSError):
+            return None
+        return (output, status)
+
+    def put(self, key, execname, output, status):
+        """Remember a compilation done in the current directory.
+
+        :type key: tuple
+        :arg key: what key() returned for the compilation
+
+        :type execname: str
+        :arg execname: name of the executable the compiler wrote
+
+        :type output: str
+        :arg output: compiler output
+
+        :type status: int
+        :arg status: compiler exit status
+        """
+        stored = []
+        try:
+            with self.lock:
+                if self.directory is None:
+                    self.directory = tempfile.mkdtemp(prefix='chplTestBuilds.',
+                                                      dir=self.tmp_dir)
+                build_dir = tempfile.mkdtemp(dir=self.directory)
+            for (stored_name, name) in zip(_executables,
+                                           (execname, execname + '_real')):
+                if os.path.isfile(name):
+                    _link_or_copy(name, os.path.join(build_dir, stored_name))
+                    stored.append(os.path.join(build_dir, stored_name))
+                else:
+                    stored.append(None)
+        except (IOError, OSError):
+            # sharing builds only saves time, so carry on without it
+            return
+        with self.lock:
+            self.builds[key] = (output, status, stored)
+
+    def clear(self):
+        """Forget the compilations, and remove their executables."""
+        with self.lock:
+            if self.directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
+            self.builds = {}
+            self.directory = None
+
+
+def _which(program):
+    if os.path.dirname(program):
+        return os.path.abspath(program)
+    for path in os.environ.get('PATH', '').split(os.pathsep):
+        candidate = os.path.join(path, program)
+        if os.path.isfile(candidate):
+            return candidate
+    return program
+
+
+def _environment_fingerprint():
+    # the CHPL_* environment, less the CHPL_TEST_* settings of the test run
+    # itself, and the node, since printchplenv inspects the machine
+    settings = ['{0}={1}'.format(k, os.environ[k]) for k in sorted(os.environ)
+                if k.startswith('CHPL_') and not k.startswith('CHPL_TEST_')]
+    settings.append('node={0}'.format(socket.gethostname()))
+    return '\n'.join(settings)
+
+
+def _names_other_directory(arg):
+    # whether an argument could be a path relative to the current directory
+    # that isn't a file in it, such as ../common.chpl or -M../lib
+    value = arg.split('=', 1)[-1]
+    return os.sep in value and not os.path.isabs(value)
+
+
+def _listdir(directory):
+    try:
+        return os.listdir(directory)
+    except OSError:
+        return []
+
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, n))
+               for n in os.listdir(entry))
+
+
+def _link_or_copy(source, name):
+    if os.path.lexists(name):
+        os.unlink(name)
+    try:
+        os.link(source, name)
+    except OSError:
+        # on another file system
+        shutil.copy2(source, name)
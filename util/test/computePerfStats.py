@@ -0,0 +1,459 @@
+#!/usr/bin/env python
+#
+# COMPUTE PERFORMANCE STATISTTICS
+# This is used by sub_test if start_test is called with the -performance flag.
+#
+# For every performance run on a particular file, this script maintains a .dat
+# by searching the output of the run for values of performance keys specified
+# in .perfkeys. It then writes these values to the .dat for every run.
+#
+# sub_test calls compute_perf_stats() directly rather than running the
+# computePerfStats script, so the .perfkeys files it reads are parsed once
+# per process, and a .dat file it has already checked and appended to isn't
+# read again.
+
+from __future__ import print_function
+import argparse
+import os
+import time
+import re
+import sys
+import difflib
+import string
+import threading
+import traceback
+
+# parsed keys files, by name: (size, mtime, keys, verify_keys, dat name)
+_key_files = {}
+
+# .dat files known to match their keys: (keys, size after the last append)
+_data_files = {}
+
+_lock = threading.Lock()
+
+# what follows a key in the output: its value
+_value = re.compile(r"\s*(\S*)")
+
+
+class PerfStatsExit(Exception):
+    """Stops a computation with the exit status the script would have."""
+
+    def __init__(self, status):
+        Exception.__init__(self, status)
+        self.status = status
+
+
+class PerfStats(object):
+    """The files and output of one computation."""
+
+    def __init__(self, test_name, output_dir, out):
+        self.data_file = "{0}/{1}.dat".format(output_dir, test_name)
+        self.errors_file = "{0}/{1}.errors".format(output_dir, test_name)
+        self.test_output = None
+        self.test_output_raw = None
+        self.out = out
+
+
+def main():
+    parser = parser_setup()
+    args = parser.parse_args()
+
+    sys.exit(compute_perf_stats(args.test_name, args.output_dir,
+                                args.keys_file, args.test_output_file,
+                                args.exec_time_out, args.perf_date,
+                                args.verify_keys))
+
+
+def compute_perf_stats(test_name, output_dir, keys_file=None,
+                       test_output_file=None, exec_time_out=False,
+                       perf_date=None, verify_keys_only=False, out=None):
+    """Append the values of a test's performance keys to its .dat file, as
+    the computePerfStats script does.
+
+    :type test_name: str
+    :arg test_name: name of the test, and of its .dat file
+
+    :type output_dir: str
+    :arg output_dir: directory of the .dat file
+
+    :type keys_file: str
+    :arg keys_file: .perfkeys file; default <test_name>.perfkeys
+
+    :type test_output_file: str
+    :arg test_output_file: test output; default <test_name>.exec.out.tmp
+
+    :type exec_time_out: bool
+    :arg exec_time_out: whether the test timed out
+
+    :type perf_date: str
+    :arg perf_date: date of the entry; default today
+
+    :type verify_keys_only: bool
+    :arg verify_keys_only: only check the keys against the .dat file
+
+    :type out: file
+    :arg out: where to write messages; default sys.stdout
+
+    :rtype: int
+    :returns: exit status of the script: 0 if every key was found, 1 if not,
+              if the test timed out or if a file couldn't be read, 2 if the
+              .dat file doesn't match
+    """
+    stats = PerfStats(test_name, output_dir, out or sys.stdout)
+    try:
+        (keys_file, test_output_file, perf_date) = setup(
+            stats, test_name, keys_file, test_output_file, perf_date)
+        (keys, verify_keys) = read_key_file(stats, keys_file, output_dir)
+
+        if not verify_keys_only:
+            valid_output = validate_output(stats, verify_keys,
+                                           test_output_file)
+
+            found_everything = True
+            if (valid_output):
+                create_data_file(stats, keys)
+                verify_data_file(stats, keys, keys_file)
+                log_timeouts(stats, keys, exec_time_out, perf_date)
+                found_everything = find_keys(stats, keys, perf_date)
+
+            if not (valid_output and found_everything) and not exec_time_out:
+                cleanup(stats)
+        else:
+            create_data_file(stats, keys)
+            verify_data_file(stats, keys, keys_file)
+            print("Valid data file.", file=stats.out)
+    except PerfStatsExit as e:
+        return e.status
+    except (IOError, OSError):
+        # fail just this test, with the error the script would have died with
+        print("".join(traceback.format_exception_only(*sys.exc_info()[:2])),
+              end="", file=stats.out)
+        return 1
+    return 0
+
+
+def find_keys(stats, keys, date):
+    found_everything = True
+    values = key_values(keys, stats.test_output)
+    with open(stats.data_file, "a") as file:
+        file.write("{0} ".format(date))
+        for key in keys:
+            stats.out.write("Looking for {0}...".format(key))
+            file.write("\t")
+            if key in values:
+                print("found it: {0}".format(values[key]), file=stats.out)
+                file.write(values[key])
+            else:
+                file.write("-")
+                print("didn't find it", file=stats.out)
+                found_everything = False
+
+        file.write("\n")
+
+    _appended(stats.data_file, keys)
+    return found_everything
+
+
+def key_values(keys, lines):
+    """Find the values of performance keys in the output of a test, in one
+    pass over it. The value of a key is the word after it on the first line
+    it is on, after the last time it is on that line.
+
+    :type keys: list
+    :arg keys: performance keys
+
+    :type lines: list
+    :arg lines: lines of output
+
+    :rtype: dict
+    :returns: the value of each key that was found
+    """
+    # lines without any key, which are most of them, are skipped with one
+    # search of the alternation of every key; longer keys are tried first,
+    # though any key that's there will do
+    wanted = set(keys)
+    any_key = re.compile("|".join(re.escape(k) for k in
+                                  sorted(wanted, key=len, reverse=True)))
+    values = {}
+    for line in lines:
+        if not wanted:
+            break
+        if not any_key.search(line):
+            continue
+        for key in list(wanted):
+            start = line.rfind(key)
+            if start >= 0:
+                values[key] = _value.match(line, start + len(key)).group(1)
+                wanted.remove(key)
+    return values
+
+
+def log_timeouts(stats, keys, time_out, date): # if we timed out
+    with open(stats.errors_file, "w") as file:
+        file.write("appending {0}\n".format(stats.data_file))
+
+    if time_out:
+        print("ERROR", file=stats.out)
+        with open(stats.data_file, "a") as file:
+            file.write("#{0} ".format(date))
+            for key in keys:
+                file.write("\t-")
+            file.write(" ### EXECUTION TIMED OUT ###\n")
+        _appended(stats.data_file, keys)
+        raise PerfStatsExit(1)
+
+
+def validate_output(stats, verify_keys, output_file):
+    # read output from file
+    with open(output_file, "r") as file:
+        stats.test_output_raw = file.read()
+        stats.test_output = stats.test_output_raw.split("\n")
+    with open(stats.errors_file, "a") as file:
+        file.write("processed {0}\n".format(output_file))
+
+    # check for valid output
+    valid_output = True
+    for key in verify_keys:
+        # match verify keys
+        m = re.match("(verify|reject):(?:(-?[1-9][0-9]*):)? ?(.+)", key)
+        if not m:
+            print("[Error: invalid verify/reject line '{}']".format(key),
+                  file=stats.out)
+            raise PerfStatsExit(1)
+        # set parts of match to variables
+        type = m.group(1)
+        num = m.group(2)
+        regex = m.group(3)
+        if num:
+            num_real = int(num)
+            if num >= 1: # line numbers are 1-indexed
+                num_real -= 1
+
+        regex_real = r"(\s|\S)*" + regex
+        is_reject = type == "reject"
+
+        # depending on whether we're asked to verify or reject
+        if not is_reject:
+            search_msg = "Checking for"
+            found_msg = "SUCCESS"
+            not_found_msg = "FAILURE"
+        else:
+            search_msg = "Checking for absence of"
+            found_msg = "FAILURE"
+            not_found_msg = "SUCCESS"
+
+        # MATCH
+        if num: # if there's a line number
+            print("{0} /{1}/ on line {2}... ".format(search_msg, regex, num),
+                  file=stats.out)
+            if re.match(regex_real, stats.test_output[num_real]):
+                valid_output &= not is_reject
+                print(found_msg, file=stats.out)
+            else:
+                valid_output &= is_reject
+                print(not_found_msg, file=stats.out)
+        else: # no line number
+            print("{0} /{1}/ on any line... ".format(search_msg, regex),
+                  file=stats.out)
+            found = False
+            for line in stats.test_output:
+                if re.match(regex_real, line):
+                    found = True
+                    print(found_msg, file=stats.out)
+                    valid_output &= not is_reject
+                    break
+            if not found:
+                valid_output &= is_reject
+                print(not_found_msg, file=stats.out)
+
+        if not valid_output:
+            print("Error: Invalid output found in {0}".format(output_file),
+                  file=stats.out)
+
+    return valid_output
+
+
+def read_key_file(stats, keys_file, output_dir):
+    # read keys from .perfkeys (or other) file, or remember them from the
+    # last time it was read
+    with open(keys_file, "r") as file:
+        st = os.fstat(file.fileno())
+        with _lock:
+            parsed = _key_files.get(keys_file)
+        if parsed is None or parsed[:2] != (st.st_size, st.st_mtime):
+            verify_keys = []
+            keys = []
+            dat_name = None
+            for line in file:
+                key = line.strip()
+                if not key[0] == "#": # not a comment
+                    st_key = key.strip()[0:6]
+                    if "verify" == st_key or "reject" == st_key:
+                        verify_keys.append(key)
+                    else:
+                        keys.append(key)
+                else: # ignore comments unless they specify .dat
+                    comment = key[1:].strip()
+                    if comment[0:5] == "file:":
+                        dat_name = comment.split()[1]
+            parsed = (st.st_size, st.st_mtime, keys, verify_keys, dat_name)
+            with _lock:
+                _key_files[keys_file] = parsed
+
+    (keys, verify_keys, dat_name) = parsed[2:]
+    if dat_name is not None:
+        stats.data_file = os.path.join(output_dir, dat_name)
+
+    with open(stats.errors_file, "a") as file:
+        file.write("processed {0}\n".format(keys_file))
+
+    return (list(keys), list(verify_keys))
+
+
+def create_data_file(stats, keys):
+    # create and setup .dat file if not done already
+    if not os.path.isfile(stats.data_file):
+        with open(stats.errors_file, "a") as file:
+            file.write("created {0}\n".format(stats.data_file))
+
+        with open(stats.data_file, "a") as file:
+            file.write("# Date")
+            for key in keys:
+                file.write("\t" + key)
+            file.write("\n")
+
+
+def verify_data_file(stats, keys_exp, keys_file):
+    data_file = stats.data_file
+    # a file this process checked and appended to last is still good
+    with _lock:
+        known = _data_files.get(data_file)
+    if (known is not None and known[0] == keys_exp and
+            known[1] == os.path.getsize(data_file)):
+        return
+
+    with open(data_file, "r") as file:
+        header = None
+        for line in file:
+            parsed = line.strip().split("\t")
+            if header == None and "# Date" in parsed[0]: # look for header line
+                header = parsed
+                columns = len(header)
+                keys_actual = header[1:]
+                continue
+            if header == None: # for all lines after the header
+                # ignore comments and empty lines
+                if parsed[0] == "" or "#" in parsed[0]:
+                    continue
+                if len(parsed) != columns:
+                    print("[Error: {} entry for {} doesn't match header length.]"
+                            .format(data_file, parsed[0]), file=stats.out)
+                    raise PerfStatsExit(2)
+
+        if header == None: # not found
+            print("[Error: {} has no header.]".format(data_file),
+                  file=stats.out)
+            raise PerfStatsExit(2)
+
+
+    keys_actual = [k.strip() for k in keys_actual]
+    keys_exp = [k.strip() for k in keys_exp]
+
+    s = difflib.SequenceMatcher(None, keys_actual, keys_exp)
+    diff = s.get_opcodes()
+
+    # the two aren't equal
+    if len(diff) > 1 or (len(diff) == 1 and diff[0][0] != "equal"):
+        print("[Error: key mismatch between {} and {}]"
+                .format(keys_file, data_file), file=stats.out)
+        print("Changes since creation of .dat file:", file=stats.out)
+        for d in diff:
+            type = d[0]
+            if type == "equal":
+                continue
+            elif type == "delete":
+                for i in range(d[1], d[2]):
+                    print("\t'{}' has been removed.".format(keys_actual[i]),
+                          file=stats.out)
+            elif type == "insert":
+                for i in range(d[3], d[4]):
+                    print("\t'{}' has been added.".format(keys_exp[i]),
+                          file=stats.out)
+            elif type == "replace":
+                if d[2] - d[1] == 1: # singlular
+                    print("\t'{}' has been replaced with '{}'.".format(
+                            keys_actual[d[1]], ", ".join(keys_exp[d[3]:d[4]])),
+                          file=stats.out)
+                else: # plural
+                    print("\t'{}' have been replaced with '{}'.".format(
+                        ", ".join(keys_actual[d[1]:d[2]]),
+                        ", ".join(keys_exp[d[3]:d[4]])), file=stats.out)
+
+        raise PerfStatsExit(2)
+
+
+def _appended(data_file, keys):
+    # remember that a .dat file matched its keys when last appended to
+    with _lock:
+        _data_files[data_file] = (list(keys), os.path.getsize(data_file))
+
+
+def setup(stats, test_name, keys_file, test_output_file, perf_date):
+    # fill in the defaults of the arguments
+    if not keys_file:
+        keys_file = "{0}.perfkeys".format(test_name)
+    if not test_output_file:
+        test_output_file = "{0}.exec.out.tmp".format(test_name)
+    if not perf_date:
+        perf_date = time.strftime("%m/%d/%y")
+        print("Using default date {0}".format(perf_date), file=stats.out)
+    else:
+        print("Using set date {0}".format(perf_date), file=stats.out)
+
+    if os.path.isfile(stats.errors_file):
+        os.remove(stats.errors_file)
+
+    return (keys_file, test_output_file, perf_date)
+
+
+def cleanup(stats):
+    print("output was: ", file=stats.out)
+    # if test output was too long, only print first and last 1000 characters
+    if len(stats.test_output_raw) > 2000:
+        head = stats.test_output_raw[:1000].strip()
+        tail = stats.test_output_raw[-1000:].strip()
+        head = ''.join(x if x in string.printable else "~" for x in head)
+        tail = ''.join(x if x in string.printable else "~" for x in tail)
+        print(head, file=stats.out)
+        print(tail, file=stats.out)
+    else:
+        out = stats.test_output_raw.strip()
+        out = ''.join(x if x in string.printable else "~" for x in out)
+        print(out, file=stats.out)
+
+    raise PerfStatsExit(1)
+
+
+def parser_setup():
+    parser = argparse.ArgumentParser(description="Compute performance"
+            "statistics")
+    parser.add_argument("test_name")
+    parser.add_argument("output_dir")
+    parser.add_argument("keys_file", nargs="?", default=False)
+    parser.add_argument("test_output_file", nargs="?", default=False)
+    parser.add_argument("exec_time_out", nargs="?", default=False, type=t_or_f)
+    parser.add_argument("perf_date", nargs="?", default=False)
+    parser.add_argument("-verify-keys", "--verify-keys", action="store_true",
+            dest="verify_keys")
+
+    return parser
+
+# UTILITY FUNCTION FOR ARGUMENT PARSING
+def t_or_f(arg):
+    ua = str(arg).upper()
+    if "TRUE" in ua: return True
+    elif "FALSE" in ua: return False
+    else: return False
+
+if __name__ == "__main__":
+    main()
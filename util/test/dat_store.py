@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+
+"""Columnar copies of performance .dat files, for reading years of history
+without parsing text.
+
+A .dat file has a header line naming its performance keys, then a line per
+trial of a run: the date and a value for each key. Its columnar copy holds
+the same table as a date column and a column per key, each an array of
+float64 that can be mapped into memory as it is:
+
+    magic            8 bytes, 'CHPLDAT1'
+    header length    uint32, little-endian
+    header           JSON: the keys, the number of rows, what the first
+                     column holds, and the size and mtime of the .dat file
+                     the copy was made from
+    padding          to a multiple of 8 bytes
+    columns          the first column, then a column per key, each the
+                     number of rows long, as little-endian float64
+
+Dates are stored as proleptic Gregorian day ordinals. A .dat file whose
+first column isn't dates, such as one graphed with genGraphs --numericX,
+stores it as numbers. A value that is missing ('-'), or isn't a number
+once any units after it are removed, is stored as NaN. Comment lines, such
+as the ones computePerfStats writes for timeouts, are left out.
+
+Copies are made and refreshed by load(), or with
+
+    dat_store.py import <dir> <.dat files>
+    dat_store.py export <copy> <.dat file>
+"""
+
+from __future__ import print_function
+
+import argparse
+import array
+import datetime
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+
+MAGIC = 'CHPLDAT1'
+SUFFIX = '.datc'
+
+DATE_FORMAT = '%m/%d/%y'
+
+# what the first column holds
+DATES = 'date'
+NUMBERS = 'number'
+
+_header_length = struct.Struct('<I')
+_units = re.compile(r'[^\d,.]+$')
+
+
+class Table(object):
+    """The contents of a .dat file, by column."""
+
+    def __init__(self, keys, x_kind, x, columns, source=None):
+        self.keys = keys
+        self.x_kind = x_kind
+        self.x = x
+        self.columns = columns
+        self.source = source
+
+    def __len__(self):
+        return len(self.x)
+
+    def column(self, key):
+        """Return the values of a key, with NaN where there are none.
+
+        :raises ValueError: if the key isn't in the table
+        """
+        return self.columns[self.keys.index(key)]
+
+
+def parse_date(value):
+    """Return the day ordinal of a date in a .dat file.
+
+    :raises ValueError: if it isn't a date
+    """
+    t = time.strptime(value.strip(), DATE_FORMAT)
+    return datetime.date(t.tm_year, t.tm_mon, t.tm_mday).toordinal()
+
+
+def parse_value(value):
+    """Return a value in a .dat file as a float: NaN if it is missing or
+    not a number, after removing any units after it.
+    """
+    try:
+        return float(_units.sub('', value))
+    except ValueError:
+        return float('nan')
+
+
+def parse_dat(filename):
+    """Read a .dat file.
+
+    :rtype: Table
+    :raises IOError: if it can't be read
+    """
+    with open(filename, 'r') as fp:
+        keys = [k.strip() for k in fp.readline()[1:].split('\t')][1:]
+        rows = []
+        for line in fp:
+            line = line.strip()
+            if line == '' or line[0] == '#':
+                continue
+            rows.append(line.split())
+
+    x_kind = DATES
+    x = array.array('d')
+    try:
+        x.extend(parse_date(row[0]) for row in rows)
+    except ValueError:
+        x_kind = NUMBERS
+        x = array.array('d', (parse_value(row[0]) for row in rows))
+    nan = float('nan')
+    columns = []
+    for i in range(1, len(keys) + 1):
+        columns.append(array.array(
+            'd', (parse_value(row[i]) if i < len(row) else nan
+                  for row in rows)))
+    return Table(keys, x_kind, x, columns, source=filename)
+
+
+def format_dat(table):
+    """Return the text of a .dat file holding a table.
+
+    :rtype: str
+    """
+    lines = ['# Date\t' + '\t'.join(table.keys) + '\n']
+    for (i, x) in enumerate(table.x):
+        if table.x_kind == DATES:
+            date = datetime.date.fromordinal(int(x)).strftime(DATE_FORMAT)
+        else:
+            date = format_number(x)
+        values = [format_number(c[i]) for c in table.columns]
+        lines.append(date + ' \t' + '\t'.join(values) + '\n')
+    return ''.join(lines)
+
+
+def write(table, filename, source_stat=None):
+    """Write the columnar copy of a table. It is written to a temporary
+    file that is renamed into place, so readers never see part of one.
+
+    :type source_stat: posix.stat_result
+    :arg source_stat: stat of the .dat file the table was read from
+    """
+    header = {'keys': table.keys, 'rows': len(table), 'x': table.x_kind}
+    if source_stat is not None:
+        header['source_size'] = source_stat.st_size
+        header['source_mtime'] = source_stat.st_mtime
+    header = json.dumps(header, sort_keys=True)
+    start = len(MAGIC) + _header_length.size + len(header)
+    padding = -start % 8
+
+    directory = os.path.dirname(filename) or '.'
+    (fd, tmp_name) = tempfile.mkstemp(prefix='.tmp.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(MAGIC)
+            fp.write(_header_length.pack(len(header)))
+            fp.write(header)
+            fp.write('\0' * padding)
+            for column in [table.x] + list(table.columns):
+                column = array.array('d', column)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                column.tofile(fp)
+        os.rename(tmp_name, filename)
+    except:
+        os.unlink(tmp_name)
+        raise
+
+
+def read(filename):
+    """Read the columnar copy of a table.
+
+    :rtype: Table
+    :returns: the table; its source is a dict of the rest of the header
+    :raises IOError: if it can't be read or isn't a copy
+    """
+    with open(filename, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size < len(MAGIC) + _header_length.size:
+            raise IOError('not a .dat copy: {0}'.format(filename))
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if mm[:len(MAGIC)] != MAGIC:
+            raise IOError('not a .dat copy: {0}'.format(filename))
+        start = len(MAGIC) + _header_length.size
+        length = _header_length.unpack(mm[len(MAGIC):start])[0]
+        header = json.loads(mm[start:start + length])
+        start += length
+        start += -start % 8
+        rows = header['rows']
+        if start + 8 * rows * (len(header['keys']) + 1) > size:
+            raise IOError('truncated .dat copy: {0}'.format(filename))
+        columns = []
+        for i in range(len(header['keys']) + 1):
+            column = array.array('d')
+            column.fromstring(mm[start:start + 8 * rows])
+            if sys.byteorder != 'little':
+                column.byteswap()
+            columns.append(column)
+            start += 8 * rows
+    finally:
+        mm.close()
+    keys = [str(k) for k in header.pop('keys')]
+    return Table(keys, str(header.pop('x')), columns[0], columns[1:],
+                 source=header)
+
+
+def store_name(store_dir, dat_file):
+    """Return the name of the columnar copy of a .dat file in a store. The
+    name has a hash of the .dat file's path in it, since the .dat files of
+    different configurations have the same name.
+    """
+    path = os.path.abspath(dat_file)
+    base = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(path).hexdigest()[:12]
+    return os.path.join(store_dir, '{0}-{1}{2}'.format(base, digest, SUFFIX))
+
+
+def import_dat(dat_file, store_dir):
+    """Make or refresh the columnar copy of a .dat file in a store.
+
+    :rtype: Table
+    :returns: the contents of the .dat file
+    :raises IOError: if the .dat file can't be read
+    """
+    st = _stat(dat_file)
+    table = parse_dat(dat_file)
+    if not os.path.isdir(store_dir):
+        try:
+            os.makedirs(store_dir)
+        except OSError:
+            # made by someone else just now
+            if not os.path.isdir(store_dir):
+                raise
+    write(table, store_name(store_dir, dat_file), st)
+    return table
+
+
+def export_dat(store_file, dat_file):
+    """Write the .dat file a columnar copy holds. Values are written as the
+    numbers they were read as, without units.
+    """
+    table = read(store_file)
+    with open(dat_file, 'w') as fp:
+        fp.write(format_dat(table))
+
+
+def load(dat_file, store_dir):
+    """Return the contents of a .dat file, from its columnar copy in a store
+    if it is up to date, and otherwise from the .dat file, making a new
+    copy.
+
+    :rtype: Table
+    :raises IOError: if the .dat file can't be read
+    """
+    st = _stat(dat_file)
+    try:
+        table = read(store_name(store_dir, dat_file))
+        if (table.source.get('source_size') == st.st_size and
+                table.source.get('source_mtime') == st.st_mtime):
+            table.source = dat_file
+            return table
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+    table = import_dat(dat_file, store_dir)
+    return table
+
+
+def _stat(filename):
+    # stat a file, failing the way opening it would
+    try:
+        return os.stat(filename)
+    except OSError as e:
+        raise IOError(e.errno, e.strerror, filename)
+
+
+def format_number(value):
+    """Return a number the way format_dat() writes it: '-' for NaN, and
+    without a fraction if it is a whole number.
+    """
+    if math.isnan(value):
+        return '-'
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert performance .dat files to and from columnar '
+                    'copies')
+    subparsers = parser.add_subparsers(dest='command')
+    p = subparsers.add_parser('import',
+                              help='make columnar copies of .dat files')
+    p.add_argument('store_dir', help='directory to keep the copies in')
+    p.add_argument('dat_files', nargs='+')
+    p = subparsers.add_parser('export',
+                              help='write the .dat file a copy holds')
+    p.add_argument('store_file')
+    p.add_argument('dat_file')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'import':
+            for dat_file in args.dat_files:
+                table = import_dat(dat_file, args.store_dir)
+                print('{0}: {1} rows -> {2}'.format(
+                    dat_file, len(table), store_name(args.store_dir, dat_file)))
+        else:
+            export_dat(args.store_file, args.dat_file)
+    except (IOError, OSError) as e:
+        sys.stderr.write('Error: {0}\n'.format(e))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""An index of the files in a test directory, so that sub_test can look
+for the many files that might configure a test without a stat for each.
+
+The directory is listed once. A name that isn't in the listing is known not
+to exist without asking the file system, which is what most lookups come
+to: FindGoodFile alone tries several names for each .good file. Names that
+are there are checked once and the answer remembered. On a network file
+system this saves a round trip for each lookup.
+
+Files created while the directory is being tested, such as executables and
+output files, aren't in the index and should be checked for directly. The
+index can be refreshed after running a script that might add input files.
+
+The index also remembers a hash of the contents of the files it is asked
+about, so that the sources of a directory are read once however many
+compilations look at them. After a refresh a file is read again only if its
+size or modification time has changed.
+"""
+
+from __future__ import print_function
+
+import hashlib
+import os
+
+
+class FileIndex(object):
+    """The files in a directory, listed once."""
+
+    def __init__(self, directory='.'):
+        self.directory = directory
+        self.digests = {}
+        self.refresh()
+
+    def refresh(self):
+        """List the directory again, forgetting what was learned about the
+        files in it.
+        """
+        self.listing = os.listdir(self.directory)
+        self.names = frozenset(self.listing)
+        self.files = {}
+        self.access_modes = {}
+        self.checked_digests = set()
+
+    def listdir(self):
+        """Return the names of the files in the directory, like
+        os.listdir().
+        """
+        return list(self.listing)
+
+    def isfile(self, name):
+        """Return whether a name is a regular file, like os.path.isfile().
+
+        :type name: str
+        :arg name: file name, relative to the directory
+        """
+        local = self._local_name(name)
+        if local is None:
+            return os.path.isfile(os.path.join(self.directory, name))
+        if local not in self.names:
+            return False
+        if local not in self.files:
+            self.files[local] = os.path.isfile(
+                os.path.join(self.directory, local))
+        return self.files[local]
+
+    def access(self, name, mode):
+        """Return whether a file can be accessed, like os.access().
+
+        :type name: str
+        :arg name: file name, relative to the directory
+
+        :type mode: int
+        :arg mode: os.R_OK, os.X_OK, etc.
+        """
+        local = self._local_name(name)
+        if local is None:
+            return os.access(os.path.join(self.directory, name), mode)
+        if local not in self.names:
+            return False
+        key = (local, mode)
+        if key not in self.access_modes:
+            self.access_modes[key] = os.access(
+                os.path.join(self.directory, local), mode)
+        return self.access_modes[key]
+
+    def digest(self, name):
+        """Return a SHA-1 hash of the contents of a file.
+
+        :type name: str
+        :arg name: file name, relative to the directory
+
+        :rtype: str
+        :returns: hex digest
+
+        :raises IOError: if the file can't be read
+        :raises OSError: if the file doesn't exist
+        """
+        path = os.path.join(self.directory, name)
+        if name not in self.checked_digests:
+            st = os.stat(path)
+            signature = (st.st_size, st.st_mtime)
+            known = self.digests.get(name)
+            if known is None or known[0] != signature:
+                h = hashlib.sha1()
+                with open(path, 'rb') as fp:
+                    h.update(fp.read())
+                self.digests[name] = (signature, h.hexdigest())
+            self.checked_digests.add(name)
+        return self.digests[name][1]
+
+    def _local_name(self, name):
+        # the name of a file in the directory itself, or None for a name
+        # somewhere else
+        name = os.path.normpath(name)
+        if os.path.isabs(name) or os.sep in name or name in (os.curdir,
+                                                             os.pardir):
+            return None
+        return name
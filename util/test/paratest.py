@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+"""Distributed testing for start_test.
+
+A coordinator hands test directories out from a shared queue to worker
+processes, which can run on this machine or on other nodes that share the
+test tree. Each worker is a start_test process run with --dist-worker. It
+tests one directory at a time and sends that directory's log back as soon as
+it is done. A directory that was handed to a worker that died is handed to
+another worker.
+
+Workers authenticate with the key in $CHPL_TEST_DIST_AUTHKEY. The coordinator
+makes one up for the workers it starts itself, so the variable only needs to
+be set by hand when workers are started on other nodes.
+"""
+
+from __future__ import print_function
+
+import binascii
+import os
+import Queue
+import socket
+import subprocess
+import threading
+import time
+
+from multiprocessing.connection import Client, Listener
+
+AUTHKEY_VAR = 'CHPL_TEST_DIST_AUTHKEY'
+
+# times a directory is handed out before giving up on it, in case it is the
+# directory that is killing the workers
+_max_attempts = 2
+
+
+def parse_address(address):
+    """Split a HOST:PORT address, where HOST defaults to localhost.
+
+    :type address: str
+    :arg address: address in HOST:PORT form
+
+    :rtype: tuple
+    :returns: (host, port) tuple
+    """
+    host, _, port = address.rpartition(':')
+    return (host or 'localhost', int(port))
+
+
+def authkey():
+    """Return the key shared by the coordinator and its workers, making one
+    up if there isn't one in the environment yet.
+    """
+    key = os.environ.get(AUTHKEY_VAR)
+    if not key:
+        key = binascii.hexlify(os.urandom(16))
+        os.environ[AUTHKEY_VAR] = key
+    return key
+
+
+class DirectoryResult(object):
+    """Completion of a directory handed to the coordinator. It has the
+    ready/wait/get interface of the results of a multiprocessing pool.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+
+    def ready(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+
+    def get(self):
+        self._done.wait()
+
+    def _set(self):
+        self._done.set()
+
+
+class _Job(object):
+    """A directory waiting for a worker."""
+
+    def __init__(self, root, dir, log):
+        self.root = root
+        self.dir = dir
+        self.log = log
+        self.attempts = 0
+        self.result = DirectoryResult()
+
+
+class Coordinator(object):
+    """Hands directories out to workers and collects their logs."""
+
+    def __init__(self, address, workers, worker_command, env=None):
+        """Listen for workers and start the local ones.
+
+        :type address: str
+        :arg address: HOST:PORT to listen on; port 0 picks a free port
+
+        :type workers: int
+        :arg workers: number of worker processes to start on this machine
+
+        :type worker_command: function
+        :arg worker_command: returns the command line of a local worker,
+                             given its number and the coordinator address
+
+        :type env: dict
+        :arg env: environment for the local workers
+        """
+        self.listener = Listener(parse_address(address), authkey=authkey())
+        self.address = '{0}:{1}'.format(*self.listener.address)
+        self.queue = Queue.Queue()
+        self.lock = threading.Lock()
+        self.connected = 0
+        self.closed = False
+
+        self._start_thread(self._accept)
+
+        env = dict(env or os.environ, **{AUTHKEY_VAR: authkey()})
+        with open(os.devnull, 'w') as devnull:
+            self.processes = [subprocess.Popen(worker_command(n, self.address),
+                                               stdout=devnull, env=env)
+                              for n in range(workers)]
+        if self.processes:
+            self._start_thread(self._watch_processes)
+
+    def submit(self, root, dir, log):
+        """Queue a directory for the next free worker.
+
+        :type root: str
+        :arg root: directory name as it appears in the log
+
+        :type dir: str
+        :arg dir: absolute path of the directory
+
+        :arg log: where to write the directory's log; anything with a write
+                  method
+
+        :rtype: DirectoryResult
+        :returns: result that is ready once the log has been written
+        """
+        job = _Job(root, dir, log)
+        self.queue.put(job)
+        return job.result
+
+    def close(self):
+        """Tell the workers to exit once the queue is empty."""
+        self.queue.put(None)
+
+    def join(self):
+        """Wait for the local workers to exit."""
+        for process in self.processes:
+            while process.poll() is None:
+                time.sleep(0.1)
+        self.closed = True
+        self.listener.close()
+
+    def _start_thread(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception:
+                # a connection that failed to authenticate, or the listener
+                # has been closed
+                if self.closed:
+                    return
+                continue
+            self._start_thread(self._serve, conn)
+
+    def _serve(self, conn):
+        # feed one worker until the queue runs dry or the worker dies
+        try:
+            (_, name) = conn.recv()
+        except (EOFError, IOError):
+            conn.close()
+            return
+        with self.lock:
+            self.connected += 1
+        try:
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    # leave the end marker for the other workers
+                    self.queue.put(None)
+                    conn.send(('exit',))
+                    break
+                try:
+                    conn.send(('run', job.root, job.dir))
+                    (_, lines) = conn.recv()
+                except (EOFError, IOError):
+                    self._worker_died(name, job)
+                    break
+                for line in lines:
+                    job.log.write(line)
+                job.result._set()
+        finally:
+            conn.close()
+            with self.lock:
+                self.connected -= 1
+
+    def _worker_died(self, name, job):
+        job.attempts += 1
+        if job.attempts < _max_attempts:
+            job.log.write('[Warning: worker {0} died while testing {1}, '
+                          'testing it again]'.format(name, job.root))
+            self.queue.put(job)
+        else:
+            job.log.write('[Error: worker {0} died while testing {1}]'
+                          .format(name, job.root))
+            job.result._set()
+
+    def _watch_processes(self):
+        # once every local worker has exited and no others are connected,
+        # nothing is left to take the rest of the queue
+        while True:
+            time.sleep(1)
+            with self.lock:
+                if (self.connected > 0 or
+                        any(p.poll() is None for p in self.processes)):
+                    continue
+            while True:
+                try:
+                    job = self.queue.get_nowait()
+                except Queue.Empty:
+                    break
+                if job is None:
+                    self.queue.put(None)
+                    break
+                job.log.write('[Error: no workers left to test {0}]'
+                              .format(job.root))
+                job.result._set()
+
+
+def run_worker(address, test_directory):
+    """Test the directories handed out by a coordinator until it says there
+    are no more.
+
+    :type address: str
+    :arg address: HOST:PORT of the coordinator
+
+    :type test_directory: function
+    :arg test_directory: tests a directory given its name as it appears in
+                         the log and its absolute path, and returns the lines
+                         of its log
+    """
+    conn = Client(parse_address(address), authkey=authkey())
+    conn.send(('hello', '{0}:{1}'.format(socket.gethostname(), os.getpid())))
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'exit':
+                break
+            (_, root, dir) = message
+            conn.send(('done', test_directory(root, dir)))
+    except EOFError:
+        # the coordinator has gone away
+        pass
+    finally:
+        conn.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""Evaluate SKIPIF, .skipif and .suppressif files.
+
+Files that aren't executable hold one condition per line, which is true
+when the file should take effect:
+
+    CHPL_COMM == none       the variable has the given value
+    CHPL_COMM != none       the variable does not have the given value
+    CHPL_TARGET_ARCH <= 86  the variable matches the regular expression
+    CHPL_TARGET_ARCH >= 86  the variable does not match the regular expression
+
+Blank lines and lines with a # are ignored. Variables are looked up in the
+environment with the settings from printchplenv filled in. This is the
+format that util/test/testEnv evaluates; evaluate() does the same without
+starting any processes after printchplenv has been run once.
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import threading
+
+import chplenv_snapshot
+
+# same as the line format accepted by testEnv
+_setting_pattern = re.compile(r'(\w*)\s*(.)=\s*(\S*)')
+
+
+_chplenv = None
+_chplenv_lock = threading.Lock()
+
+
+def chplenv(util_dir):
+    """Return the settings printed by printchplenv --sh, from the snapshot
+    taken by start_test if there is one. Otherwise printchplenv is run the
+    first time.
+
+    :type util_dir: str
+    :arg util_dir: the util/ directory holding printchplenv
+
+    :rtype: dict
+    :returns: CHPL_* variable names and values
+    """
+    global _chplenv
+    with _chplenv_lock:
+        if _chplenv is None:
+            snapshot = chplenv_snapshot.load()
+            if snapshot:
+                _chplenv = snapshot['printchplenv --sh']
+            else:
+                _chplenv = chplenv_snapshot.printchplenv(util_dir, '--sh')
+    return _chplenv
+
+
+def testenv_environment(util_dir):
+    """Return the environment testEnv evaluates files in: the current one
+    with the printchplenv settings, other than CHPL_HOME, filled in.
+    """
+    env = os.environ.copy()
+    env.update((k, v) for (k, v) in chplenv(util_dir).items()
+               if k != 'CHPL_HOME')
+    return env
+
+
+def evaluate(skipif_file, env):
+    """Evaluate a file of conditions the way testEnv does.
+
+    :type skipif_file: str
+    :arg skipif_file: skipif file name
+
+    :type env: dict
+    :arg env: environment to look variables up in
+
+    :rtype: str
+    :returns: '1' if any condition is true, otherwise '0'
+
+    :raises ValueError: for a line that isn't a condition
+    """
+    skip = False
+    with open(skipif_file, 'r') as fp:
+        for line in fp:
+            if not line.strip() or '#' in line:
+                continue
+            match = _setting_pattern.search(line)
+            if not match:
+                raise ValueError('badly formatted line in {0}: {1}'
+                                 .format(skipif_file, line.rstrip()))
+            (name, op, value) = match.groups()
+            actual = env.get(name, '')
+            if op == '=':
+                skip = skip or actual == value
+            elif op == '!':
+                skip = skip or actual != value
+            elif op == '<':
+                skip = skip or re.search(value, actual) is not None
+            elif op == '>':
+                skip = skip or re.search(value, actual) is None
+            else:
+                raise ValueError('badly formatted line in {0}: {1}'
+                                 .format(skipif_file, line.rstrip()))
+    return '1' if skip else '0'
+
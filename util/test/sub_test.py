@@ -0,0 +1,2284 @@
+#!/usr/bin/env python
+#
+# Rewrite of sub_test by Sung-Eun Choi (sungeun@cray.com)
+#  sub_test is used by start_test in the Chapel Testing system
+#  August 2009
+#
+# This script can be overridden with a script by the same name
+#  placed in the test directory.
+#
+# The use and behavior of the various environment variables,
+#  settings, and files were copied straight from sub_test.  They
+#  were added/modified to sub_test over the years, and their use
+#  is inconsistent and a bit of a mess.  I like to think that this
+#  is due to the fact that the original sub_test was written in csh,
+#  which was probably pretty novel at the time but is quite limited
+#  by today's standards.  In addition, I implemented the timeout
+#  mechanism directly rather than calling out to the timedexec
+#  (perl) script.
+#
+# For compatibility reasons, I have maintained the behavior of the
+#  original sub_test.  Any new features (e.g., internal timeout
+#  mechanism) or modified behaviors (e.g., multiple .compopts,
+#  multiple .execopts, custom .good files) will not interfere with
+#  the expected behavior of tests that do not use the features or
+#  behaviors.
+#
+#
+# ENVIRONMENT VARIABLES:
+#
+# CHPL_HOME: Grabbed from the environment or deduced based on the path to
+#    the compiler.
+# CHPL_TEST_VGRND_COMP: Use valgrind on the compiler
+# CHPL_TEST_VBRND_EXE: Use valgrind on the test program
+# CHPL_VALGRIND_OPTS: Options to valgrind
+# CHPL_TEST_FUTURES: 2 == test futures only
+#                    1 == test futures and non-futures
+#                    0 == test non-futures only
+# CHPL_TEST_NOTESTS: Test the tests that are marked "notest" (see below)
+# LAUNCHCMD: Uses this command to launch the test program
+# CHPL_TEST_INTERP: DEPRECATED
+# CHPL_TEST_PERF: Run as a performance test (same as -performance flag)
+# CHPL_TEST_PERF_LABEL: The performance label, e.g. "perf"
+# CHPL_TEST_PERF_DIR: Scratch directory for performance data
+# CHPL_TEST_PERF_TRIALS: Default number of trials for perf tests
+# CHPL_ONETEST: Name of the one test in this directory to run
+# CHPL_TEST_SINGLES: If false, test the entire directory
+# CHPL_SYSTEM_PREEXEC: If set, run script on test output prior to execution
+# CHPL_SYSTEM_PREDIFF: If set, run that script on each test output
+# CHPL_COMM: Chapel communication layer
+# CHPL_COMPONLY: Only build the test (same as -noexec flag)
+# CHPL_NO_STDIN_REDIRECT: do not redirect stdin when running tests
+#                         also, skip tests with .stdin files
+# CHPL_LAUNCHER_TIMEOUT: if defined, pass an option/options to the executable
+#                        for it to enforce timeout instead of sub_test;
+#                        the value of the variable determines the option format.
+# CHPL_TEST_TIMEDEXEC: If set, enforce timeouts with util/test/timedexec
+#                      instead of sub_test's own mechanism.
+# CHPL_TEST_TIMEOUT: The default global timeout to use.
+# CHPL_TEST_MAX_OUTPUT: Megabytes of output from a test program to keep in its
+#                       execution log; the rest is left out, with a note saying
+#                       so. Not applied with CHPL_LAUNCHER_TIMEOUT or
+#                       CHPL_TEST_TIMEDEXEC.
+# CHPL_TEST_UNIQUIFY_EXE: Uniquify the name of the test executable in the test
+#                         system. CAUTION: This wont necessarily work for all
+#                         tests, but can allow for running multiple start_tests
+#                         over a directory in parallel.
+# CHPL_TEST_COMPILE_CACHE: Directory of a cache of compiled tests to reuse;
+#                          see compile_cache.py.
+# CHPL_TEST_COMPILE_CACHE_SIZE: Size limit of that cache, in megabytes.
+# CHPL_TEST_JOBS: Number of tests in this directory to run at once. Ignored
+#                 for performance testing.
+# CHPL_TEST_PIPELINE: Number of tests in this directory to compile at once,
+#                     while the tests execute one at a time in order. Ignored
+#                     for performance testing and when CHPL_TEST_JOBS is set.
+# CHPL_TEST_ROOT_DIR: Absolute path to the test/ dir. Useful when test dir is
+#                     not under $CHPL_HOME. Should not be set when test/ is
+#                     under $CHPL_HOME. When it is set and the path prefixes a
+#                     test in the logs, it will be removed (from the logs).
+#
+#
+# DIRECTORY-WIDE FILES:  These settings are for the entire directory and
+#  in many cases can be overridden or augmented with test-specific settings.
+#
+# NOEXEC: Do not execute tests in this directory
+# NOVGRBIN: Do not execute valgrind
+# COMPSTDIN: Get stdin from this file (default /dev/null)
+# COMPOPTS: Compiler flags
+# LASTCOMPOPTS: Compiler flags to be put at the end of the command line
+# CHPLDOCOPTS: chpldoc flags
+# EXECENV: Environment variables to be applied to the entire directory
+# EXECOPTS: Test program flags to be applied to the entire directory
+# LASTEXECOPTS: Test program flags to be put at the end of the command line
+# NUMLOCALES: Number of locales to use
+# CATFILES: List of files whose contents are added to end of test output
+# PREDIFF: Script to execute before diff'ing output (arguments: <test
+#    executable>, <log>, <compiler executable>)
+# PREEXEC: Script to execute before executing test program (arguments: <test
+#    executable>, <log>, <compiler executable>)
+# PRECOMP: Script to execute before running the compiler (arguments: <test
+#    executable>, <log>, <compiler executable>).
+# PERFNUMTRIALS: Number of trials to run for performance testing
+#
+#
+# TEST-SPECIFIC FILES:  These setting override or augment the directory-wide
+#  settings.  Unless otherwise specified, these files are named
+#  <test executable>.suffix (where suffix is one of the following).
+#
+# .good: "Golden" output file (can have different basenames)
+# .compopts: Additional compiler options
+# .perfcompopts: Additional compiler options for performance testing
+# .lastcompopts: Additional compiler options to be added at the end of the
+#    command line
+# .chpldocopts: Additional chpldoc options.
+# .execenv: Additional environment variables for the test
+# .execopts: Additional test options
+# .perfexecenv: Additional environment variables for performance testing
+# .perfexecopts: Additional test options for performance testing
+# .perfnumtrials: Number of trials to run for performance testing
+# .notest: Do not run this test
+# .numlocales: Number of locales to use (overrides NUMLOCALES)
+# .future: Future test
+# .ifuture: Future test
+# .noexec: Do not execute this test
+# .skipif: Skip this test if certain environment conditions hold true
+# .suppressif: Suppress this test if certain environment conditions hold true
+# .timeout: Test timeout (overrides TIMEOUT)
+# .perftimeout: Performance test timeout
+# .killtimeout: Kill timeout (overrides KILLTIMEOUT)
+# .catfiles: Additional list of files whose contents are added to end of
+#    test output
+# .precomp: Additional script to execute before compiling the test
+# .prediff: Additional script to execute before diff'ing output
+# .preexec: Additional script to execute before executing test program
+# .perfkeys: Existence indicates a performance test.  Contents specifies
+#    performance "keys"
+#
+# In general, the performance label from CHPL_TEST_PERF_LABEL is used
+# instead of "perf" in the above suffixes, and its all-caps version is used
+# in the all-caps file names instead "PERF".
+
+from __future__ import with_statement
+
+import sys, os, subprocess, string, signal
+import operator
+import fnmatch, time
+import re
+import shlex
+import datetime
+import threading
+import StringIO
+from multiprocessing.pool import ThreadPool
+import test_times
+import skipif
+import chplenv_snapshot
+import compile_cache
+import compare
+import computePerfStats
+import file_index
+import supervise
+
+localdir = ''
+sub_test_start_time = time.time()
+def elapsed_sub_test_time():
+    """Print elapsed time for sub_test call to console."""
+    global sub_test_start_time, localdir
+    elapsed_sec = time.time() - sub_test_start_time
+
+    test_name = localdir
+    if 'CHPL_ONETEST' in os.environ:
+        chpl_name = os.environ.get('CHPL_ONETEST')
+        base_name = os.path.splitext(chpl_name)[0]
+        test_name = os.path.join(test_name, base_name)
+
+    print('[Finished subtest "{0}" - {1:.3f} seconds]\n'.format(test_name, elapsed_sec))
+
+# Children that compile and execute tests are watched by one supervisor
+#  thread, which enforces their timeouts.  Sending SIGALRM (or any other
+#  signal) to Python can be unreliable (will not respond if holding certain
+#  locks), so the supervisor never relies on signals to itself.
+#
+supervisor = supervise.Supervisor()
+
+def LauncherTimeoutArgs(seconds):
+    if useLauncherTimeout == 'pbs' or useLauncherTimeout == 'slurm':
+        # --walltime=hh:mm:ss
+        m, s = divmod(seconds, 60)
+        h, m = divmod(m, 60)
+        fmttime = '--walltime={0:02d}:{1:02d}:{2:02d}'.format(h, m, s)
+        return [fmttime]
+    else:
+        Fatal('LauncherTimeoutArgs encountered an unknown format spec: ' + \
+              useLauncherTimeout)
+
+
+#
+# Test output class:  Stands in for sys.stdout when tests are run by a pool
+#  of worker threads.  Output written while a worker is running a test is
+#  kept with that test, so that it can be printed in the usual order once the
+#  test is done.
+#
+class TestOutput(object):
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def start(self):
+        self.local.buffer = []
+
+    def stop(self):
+        output = ''.join(self.local.buffer)
+        del self.local.buffer
+        return output
+
+    def write(self, s):
+        buffer = getattr(self.local, 'buffer', None)
+        if buffer is None:
+            self.stream.write(s)
+        else:
+            buffer.append(s)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) is None:
+            self.stream.flush()
+
+
+#
+# Execution turns class:  When tests are pipelined, their compilations run
+#  side by side but their executions take turns, in test order, so that no
+#  two executions compete with each other.  A test's turn ends when it is
+#  done, whether or not it executed anything.
+#
+class ExecutionTurns(object):
+    def __init__(self, tests):
+        self.order = list(tests)
+        self.next = 0
+        self.finished = set()
+        self.condition = threading.Condition()
+
+    def wait(self, testname):
+        with self.condition:
+            while self.order[self.next] != testname:
+                self.condition.wait()
+
+    def done(self, testname):
+        with self.condition:
+            self.finished.add(testname)
+            while (self.next < len(self.order) and
+                   self.order[self.next] in self.finished):
+                self.next += 1
+            self.condition.notify_all()
+
+executionTurns = None
+
+
+#
+# Auxilliary functions
+#
+
+# Escape all special characters
+def ShellEscape(arg):
+    return re.sub(r'([\\!@#$%^&*()?\'"|<>[\]{} ])', r'\\\1', arg)
+
+# Escape all special characters but leave spaces alone
+def ShellEscapeCommand(arg):
+    return re.sub(r'([\\!@#$%^&*()?\'"|<>[\]{}])', r'\\\1', arg)
+
+
+# Output longer than this is trimmed to its start and end. It matches what
+#  the supervisor keeps of output it streams to a file.
+trim_size = 2*supervise.PREVIEW_SIZE # ~1/4 MB
+
+# Grabs the start and end of the output and replaces non-printable chars with ~
+def trim_output(output):
+    if len(output) > trim_size:
+        new_output = output[:trim_size/2]
+        new_output += output[-trim_size/2:]
+        output = new_output
+    return ''.join(s if s in string.printable else "~" for s in output)
+
+# trim_output() of the contents of a file, reading only what is kept
+def trim_output_file(filename):
+    with open(filename, 'r') as fp:
+        fp.seek(0, os.SEEK_END)
+        if fp.tell() <= trim_size:
+            fp.seek(0)
+            return trim_output(fp.read())
+        fp.seek(0)
+        output = fp.read(trim_size/2)
+        fp.seek(-trim_size/2, os.SEEK_END)
+        output += fp.read()
+    return trim_output(output)
+
+
+# return True if f has .chpl extension
+def IsChplTest(f):
+    if re.match(r'^.+\.(chpl|test\.c)$', f):
+        return True
+    else:
+        return False
+
+perflabel = '' # declare it for the following functions
+
+# file suffix: 'keys' -> '.perfkeys' etc.
+def PerfSfx(s):
+    return '.' + perflabel + s
+
+# directory-wide file: 'COMPOPTS' or 'compopts' -> './PERFCOMPOPTS' etc.
+def PerfDirFile(s):
+    return './' + perflabel.upper() + s.upper()
+
+# test-specific file: (foo,keys) -> foo.perfkeys etc.
+def PerfTFile(test_filename, sfx):
+    return test_filename + '.' + perflabel + sfx
+
+# read file with comments
+def ReadFileWithComments(f, ignoreLeadingSpace=True):
+    # sys.stdout.write('Opening: %s\n'%(f))
+    with open(f, 'r') as myfile:
+      mylines = myfile.readlines()
+    mylist=list()
+    for line in mylines:
+        line = line.rstrip()
+        # ignore blank lines
+        if not line.strip(): continue
+        # ignore comments
+        if ignoreLeadingSpace:
+            if line.lstrip()[0] == '#': continue
+        else:
+            if line[0] == '#': continue
+        # expand shell variables
+        line = os.path.expandvars(line)
+        mylist.append(line)
+    return mylist
+
+# diff 2 files, returning the exit status diff would
+def DiffFiles(f1, f2):
+    sys.stdout.write('[Executing diff %s %s]\n'%(f1, f2))
+    try:
+        myoutput = compare.diff_files(f1, f2)
+    except (IOError, OSError):
+        return 2
+    if myoutput:
+        sys.stdout.write(trim_output(myoutput))
+        return 1
+    return 0
+
+# diff output vs. .bad file, filtering line numbers out of error messages that arise
+# in module files.
+def DiffBadFiles(f1, f2):
+    sys.stdout.write('[Executing diff %s %s]\n'%(f1, f2))
+    try:
+        myoutput = compare.diff_files_ignoring_module_line_numbers(f1, f2)
+    except (IOError, OSError):
+        return 2
+    if myoutput:
+        sys.stdout.write(myoutput)
+        return 1
+    return 0
+
+# clean up after the test has been built
+def cleanup(execname):
+    try:
+        if execname is not None:
+            if os.path.isfile(execname):
+                os.unlink(execname)
+            if os.path.isfile(execname+'_real'):
+                os.unlink(execname+'_real')
+    except (IOError, OSError) as ex:
+        # If the error is "Device or resource busy", call lsof on the file (or
+        # handle for windows) to see what is holding the file handle, to help
+        # debug the issue.
+        if isinstance(ex, OSError) and ex.errno == 16:
+            handle = which('handle')
+            lsof = which('lsof')
+            if handle is not None:
+                sys.stdout.write('[Inspecting open file handles with: {0}\n'.format(handle))
+                sys.stdout.write(subprocess.Popen([handle],
+                             stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+            elif lsof is not None:
+                cmd = [lsof, execname]
+                sys.stdout.write('[Inspecting open file handles with: {0}\n'.format(' '.join(cmd)))
+                sys.stdout.write(subprocess.Popen(cmd,
+                             stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+        # Do not print the warning for cygwin32 when errno is 16 (Device or resource busy).
+        if not (getattr(ex, 'errno', 0) == 16 and platform == 'cygwin32'):
+            sys.stdout.write('[Warning: could not remove {0}: {1}]\n'.format(execname, ex))
+
+def which(program):
+    """Returns absolute path to program, if it exists in $PATH. If not found,
+    returns None.
+
+    From: http://stackoverflow.com/a/377028
+    """
+    def is_exe(fpath):
+        return os.path.isfile(fpath) and os.access(fpath, os.X_OK)
+
+    fpath, fname = os.path.split(program)
+    if fpath:
+        if is_exe(program):
+            return program
+    else:
+        for path in os.environ.get('PATH', '').split(os.pathsep):
+            path = path.strip('"')
+            exe_file = os.path.join(path, program)
+            if is_exe(exe_file):
+                return exe_file
+    return None
+
+
+# print (compopts: XX, execopts: XX) for later decoding of failed tests
+def printTestVariation(compoptsnum, compoptslist,
+                       execoptsnum=0, execoptslist=[] ):
+    printCompOpts = True
+    printExecOpts = True
+    if compoptsnum==0 or len(compoptslist) <= 1:
+        printCompOpts = False
+    if execoptsnum==0 or len(execoptslist) <= 1:
+        printExecOpts = False
+
+    if (not printCompOpts) and (not printExecOpts):
+        return;
+
+    sys.stdout.write(' (')
+    if printCompOpts:
+        sys.stdout.write('compopts: %d'%(compoptsnum))
+    if printExecOpts:
+        if printCompOpts:
+            sys.stdout.write(', ')
+        sys.stdout.write('execopts: %d'%(execoptsnum))
+    sys.stdout.write(')')
+    return
+
+# return true if string is an integer
+def IsInteger(str):
+    try:
+        int(str)
+        return True
+    except ValueError:
+        return False
+
+# read integer value from a file
+def ReadIntegerValue(f, localdir):
+    to = ReadFileWithComments(f)
+    if to:
+        for l in to:
+            if l[0] == '#':
+                continue
+            if IsInteger(l):
+                return string.atoi(l)
+            else:
+                break
+    Fatal('Invalid integer value in '+f+' ('+localdir+')')
+
+# report an error message and exit
+def Fatal(message):
+    sys.stdout.write('[Error (sub_test): '+message+']\n')
+    magic_exit_code = reduce(operator.add, map(ord, 'CHAPEL')) % 256
+    sys.exit(magic_exit_code)
+
+# Attempts to find an appropriate timer to use. The timer must be in
+# util/test/timers/. Expects to be passed a file containing only the name of
+# the timer script. If the file is improperly formatted the default timer is
+# used, and if the timer is not executable or can't be found 'time -p' is used
+def GetTimer(f):
+    timersdir = os.path.join(utildir, 'test', 'timers')
+    defaultTimer = os.path.join(timersdir, 'defaultTimer')
+
+    lines = ReadFileWithComments(f)
+    if len(lines) != 1:
+        sys.stdout.write('[Error "%s" must contain exactly one non-comment line '
+            'with the name of the timer located in %s to use. Using default ' 
+            'timer %s.]\n' %(f, timersdir, defaultTimer))
+        timer = defaultTimer
+    else:
+        timer = os.path.join(timersdir, lines[0])
+
+    if not os.access(timer,os.R_OK|os.X_OK):
+        sys.stdout.write('[Error cannot execute timer "%s", using "time -p"]\n' %(timer))
+        return 'time -p'
+
+    return timer
+
+# attempts to find an appropriate .good file. Good files are expected to be of
+# the form basename.<configuration>.<commExecNums>.good. Where configuration
+# options are one of the below configuration specific parameters that are
+# checked for. E.G the current comm layer. commExecNums are the optional
+# compopt and execopt number to enable different .good files for different
+# compopts/execopts with explicitly specifying name. 
+def FindGoodFile(basename, commExecNums=['']):
+    
+    goodfile = ''
+    for commExecNum in commExecNums:
+        # Try the machine specific .good
+        if not fileIndex.isfile(goodfile):
+            goodfile = basename+'.'+machine+commExecNum+'.good'
+        # Else if --no-local try the no-local .good file.
+        if not fileIndex.isfile(goodfile):
+            if '--no-local' in envCompopts:
+                goodfile=basename+'.no-local'+commExecNum+'.good'
+        # Else try comm and locale model specific .good file.
+        if not fileIndex.isfile(goodfile):
+            goodfile=basename+chplcommstr+chpllmstr+commExecNum+'.good'
+        # Else try the comm-specific .good file.
+        if not fileIndex.isfile(goodfile):
+            goodfile=basename+chplcommstr+commExecNum+'.good'
+        # Else try locale model specific .good file.
+        if not fileIndex.isfile(goodfile):
+            goodfile=basename+chpllmstr+commExecNum+'.good'
+        # Else try the platform-specific .good file.
+        if not fileIndex.isfile(goodfile):
+            goodfile=basename+'.'+platform+commExecNum+'.good'
+        # Else use the execopts-specific .good file.
+        if not fileIndex.isfile(goodfile):
+            goodfile=basename+commExecNum+'.good'
+
+    return goodfile
+
+def get_exec_log_name(execname, comp_opts_count=None, exec_opts_count=None):
+    """Returns the execution output log name based on number of comp and exec opts."""
+    suffix = '.exec.out.tmp'
+    if comp_opts_count is None and exec_opts_count is None:
+        return '{0}{1}'.format(execname, suffix)
+    else:
+        return '{0}.{1}-{2}{3}'.format(execname, comp_opts_count, exec_opts_count, suffix)
+
+# If the first line of the skipif file contains '/usr/bin/env', then just execute it.
+# (Don't forget to add execute permission to a script skipif file.)
+# Otherwise, evaluate its conditions in-process the way testEnv does.
+def runSkipIf(skipifName):
+    name = './' + skipifName
+    # Already a file because os.R_OK is true?
+    if fileIndex.access(name, os.X_OK):
+        if chplenvSnapshot:
+            chpl_env = chplenvSnapshot['printchplenv --simple']
+        else:
+            env_cmd = [os.path.join(utildir, 'printchplenv'), '--simple']
+            chpl_env = subprocess.Popen(env_cmd, stdout=subprocess.PIPE, close_fds=True).communicate()[0]
+            chpl_env = dict(map(lambda l: l.split('='), chpl_env.splitlines()))
+
+        skipif_env = os.environ.copy()
+        skipif_env.update(chpl_env)
+        skiptest = subprocess.Popen([name], stdout=subprocess.PIPE, env=skipif_env, close_fds=True).communicate()[0]
+    else:
+        try:
+            skiptest = skipif.evaluate(name, skipif.testenv_environment(utildir))
+        except (ValueError, IOError):
+            skiptest = ''  # reported by the caller
+    return skiptest
+
+# Settings that are the same for every directory tested with a compiler.
+# They are worked out once, and run_directory() makes them globals for the
+# rest of sub_test.
+class Config(object):
+    def __init__(self, compiler):
+        # Find the base installation
+        if not os.access(compiler,os.R_OK|os.X_OK):
+            Fatal('Cannot execute compiler \''+compiler+'\'')
+
+        is_chpldoc = compiler.endswith('chpldoc')
+        is_chpl_ipe = compiler.endswith('chpl-ipe')
+
+        path_to_compiler=os.path.abspath(os.path.dirname(compiler))
+        # Assume chpl binary is 2 directory levels down in the base installation
+        (chpl_base, tmp) = os.path.split(path_to_compiler)
+        (chpl_base, tmp) = os.path.split(chpl_base)
+        chpl_base=os.path.normpath(chpl_base)
+        # sys.stdout.write('CHPL_BASE='+chpl_base+'\n')
+
+        # If $CHPL_HOME is not set, use the base installation of the compiler
+        chpl_home=os.getenv('CHPL_HOME', chpl_base);
+        chpl_home=os.path.normpath(chpl_home)
+        # sys.stdout.write('CHPL_HOME='+chpl_home+'\n');
+
+        # Find the test util directory -- set this in start_test to permit
+        # a version of start_test other than the one in CHPL_HOME to be used
+        utildir=os.getenv('CHPL_TEST_UTIL_DIR');
+        if utildir is None or not os.path.isdir(utildir):
+            Fatal('Cannot find test util directory {0}'.format(utildir))
+
+        # Needed for MacOS mount points
+        utildir = os.path.realpath(utildir)
+        # sys.stdout.write('utildir='+utildir+'\n');
+
+        # The Chapel configuration worked out once by start_test, if it still applies
+        chplenvSnapshot = chplenv_snapshot.load()
+
+        # Find the c compiler
+        # We open the compileline inside of CHPL_HOME rather than CHPL_TEST_UTIL_DIR on
+        # purpose. compileline will not work correctly in some configurations when run
+        # outside of its directory tree.
+        if chplenvSnapshot and chplenvSnapshot['c_compiler'] is not None:
+            c_compiler = chplenvSnapshot['c_compiler']
+        else:
+            p = subprocess.Popen([os.path.join(chpl_home,'util','config','compileline'),
+                                    '--compile'],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=True)
+            c_compiler = p.communicate()[0].rstrip()
+            if p.returncode != 0:
+              Fatal('Cannot find c compiler')
+
+        # Find the test directory
+        testdir=chpl_home+'/test'
+        if os.path.isdir(testdir)==0:
+            testdir=chpl_home+'/examples'
+            if os.path.isdir(testdir)==0:
+                Fatal('Cannot find test directory '+chpl_home+'/test or '+testdir)
+        # Needed for MacOS mount points
+        testdir = os.path.realpath(testdir)
+        # sys.stdout.write('testdir='+testdir+'\n');
+
+        # If user specified a different test directory (e.g. with --test-root flag on
+        # start_test), use it instead.
+        test_root_dir = os.environ.get('CHPL_TEST_ROOT_DIR')
+        if test_root_dir is not None:
+            testdir = test_root_dir
+
+        # Use timedexec only if asked to, or if there are no process groups to
+        #  kill a test with
+        useTimedExec = (os.getenv('CHPL_TEST_TIMEDEXEC') is not None or
+                        not hasattr(os, 'killpg'))
+        timedexec = None
+        if useTimedExec:
+            timedexec=utildir+'/test/timedexec'
+            if not os.access(timedexec,os.R_OK|os.X_OK):
+                Fatal('Cannot execute timedexec script \''+timedexec+'\'')
+        # sys.stdout.write('timedexec='+timedexec+'\n');
+
+        # bytes of execution output to keep, if limited
+        maxExecOutput = os.getenv('CHPL_TEST_MAX_OUTPUT')
+        if maxExecOutput:
+            maxExecOutput = int(float(maxExecOutput) * 1024 * 1024)
+        else:
+            maxExecOutput = None
+
+        # HW platform
+        if chplenvSnapshot:
+            platform = chplenvSnapshot['target_platform']
+        else:
+            platform=subprocess.Popen([utildir+'/chplenv/chpl_platform.py', '--target'], stdout=subprocess.PIPE, close_fds=True).communicate()[0]
+            platform = platform.strip()
+        # sys.stdout.write('platform='+platform+'\n')
+
+        # Machine name we are running on
+        machine=os.uname()[1].split('.', 1)[0]
+        # sys.stdout.write('machine='+machine+'\n')
+
+        # compilations from earlier runs, if asked to keep them
+        compileCache = compile_cache.from_environment(utildir)
+
+        # builds of identical compilations during this run, for later ones
+        #  to reuse
+        sharedBuilds = compile_cache.SharedBuilds(os.getenv('CHPL_TEST_TMP_DIR'))
+
+        self.compiler = compiler
+        self.is_chpldoc = is_chpldoc
+        self.is_chpl_ipe = is_chpl_ipe
+        self.chpl_home = chpl_home
+        self.utildir = utildir
+        self.chplenvSnapshot = chplenvSnapshot
+        self.c_compiler = c_compiler
+        self.testdir = testdir
+        self.useTimedExec = useTimedExec
+        self.timedexec = timedexec
+        self.maxExecOutput = maxExecOutput
+        self.platform = platform
+        self.machine = machine
+        self.compileCache = compileCache
+        self.sharedBuilds = sharedBuilds
+
+
+# Settings of the current directory, from the environment and the files in
+# the directory, for run_test() to use
+def set_up_directory():
+    global systemPreexec, systemPrediff, useLauncherTimeout, uniquifyTests, \
+        testjobs, pipelinejobs, localdir, chplcomm, chplcommstr, chpllauncher, chpllmstr, \
+        perftest, perflabel, perfdir, compoptssuffix, chpldocsuffix, \
+        execenvsuffix, execoptssuffix, timeoutsuffix, globalTimeout, \
+        execTimeWarnLimit, directoryTimeout, globalTimer, globalKillTimeout, \
+        execute, globalCompstdin, globalLastcompopts, globalLastexecopts, \
+        globalNumlocales, globalCatfiles, valgrindcomp, valgrindcompopts, \
+        valgrindbin, valgrindbinopts, testfutures, testnotests, launchcmd, \
+        futureSuffix, printpassesfile, compperftest, compperfdir, \
+        compperfkeyfile, tempDatFilesDir, directoryCompopts, envCompopts, \
+        globalChpldocOpts, globalNumTrials, globalExecenv, globalExecopts, \
+        envExecopts, globalPrecomp, globalPrediff, globalPreexec, fileIndex, \
+        dirlist, testsrc, original_compiler
+
+    # The files in this directory, listed once for the many lookups below and
+    #  in run_test()
+    fileIndex = file_index.FileIndex()
+
+    # Get the system-wide preexec
+    systemPreexec = os.getenv('CHPL_SYSTEM_PREEXEC')
+    if systemPreexec is not None:
+        if not os.access(systemPreexec, os.R_OK|os.X_OK):
+            Fatal("Cannot execute system-wide preexec '{0}'".format(systemPreexec))
+
+    # Get the system-wide prediff
+    systemPrediff = os.getenv('CHPL_SYSTEM_PREDIFF')
+    if systemPrediff:
+      if not os.access(systemPrediff,os.R_OK|os.X_OK):
+        Fatal('Cannot execute system-wide prediff \''+systemPrediff+'\'')
+
+    # Use the launcher walltime option for timeout
+    useLauncherTimeout = os.getenv('CHPL_LAUNCHER_TIMEOUT')
+
+    uniquifyTests = False
+    if os.getenv('CHPL_TEST_UNIQUIFY_EXE') != None:
+        uniquifyTests = True
+
+    # Number of tests to run at once
+    testjobs = int(os.getenv('CHPL_TEST_JOBS', '1'))
+
+    # Number of tests to compile at once while they execute one at a time
+    pipelinejobs = int(os.getenv('CHPL_TEST_PIPELINE', '1'))
+
+    # Get the current directory (normalize for MacOS case-sort-of-sensitivity)
+    localdir = string.replace(os.path.normpath(os.getcwd()), testdir, '.')
+    # sys.stdout.write('localdir=%s\n'%(localdir))
+
+    if localdir.find('./') == 0:
+        # strip off the leading './'
+        localdir = string.lstrip(localdir, '.')
+        localdir = string.lstrip(localdir, '/')
+    # sys.stdout.write('localdir=%s\n'%(localdir))
+
+    # CHPL_COMM
+    chplcomm=os.getenv('CHPL_COMM','none').strip()
+    chplcommstr='.comm-'+chplcomm
+    # sys.stdout.write('chplcomm=%s\n'%(chplcomm))
+
+    # CHPL_LAUNCHER
+    chpllauncher=os.getenv('CHPL_LAUNCHER','none').strip()
+
+    # CHPL_LOCALE_MODEL
+    chpllm=os.getenv('CHPL_LOCALE_MODEL','flat').strip()
+    chpllmstr='.lm-'+chpllm
+    #sys.stdout.write('lm=%s\n'%(chpllm))
+
+    #
+    # Test options for all tests in this directory
+    #
+
+    if os.getenv('CHPL_TEST_PERF')!=None:
+        perftest=True
+        perflabel=os.getenv('CHPL_TEST_PERF_LABEL')
+        perfdir=os.getenv('CHPL_TEST_PERF_DIR')
+        perfdescription = os.getenv('CHPL_TEST_PERF_DESCRIPTION')
+        if perfdescription != None:
+            sys.stdout.write('Setting perfdir to %s from %s because of additional perf description\n' %(os.path.join(perfdir, perfdescription), perfdir))
+            perfdir = os.path.join(perfdir, perfdescription)
+        else:
+            perfdescription= ''
+        if perflabel==None or perfdir==None:
+            Fatal('$CHPL_TEST_PERF_DIR and $CHPL_TEST_PERF_LABEL must be set for performance testing')
+    else:
+        perftest=False
+        perflabel=''
+
+    compoptssuffix = PerfSfx('compopts')  # .compopts or .perfcompopts or ...
+
+    # If compiler is chpldoc, use .chpldocopts for options.
+    chpldocsuffix = '.chpldocopts'
+
+    execenvsuffix  = PerfSfx('execenv')   # .execenv  or .perfexecenv  or ...
+    execoptssuffix = PerfSfx('execopts')  # .execopts or .perfexecopts or ...
+    timeoutsuffix  = PerfSfx('timeout')   # .timeout  or .perftimeout  or ...
+    # sys.stdout.write('perftest=%d perflabel=%s\n'%(perftest,perflabel))
+
+    # Get global timeout
+    if os.getenv('CHPL_TEST_VGRND_COMP')=='on':
+        globalTimeout=1000
+    else:
+        globalTimeout=300
+    globalTimeout = int(os.getenv('CHPL_TEST_TIMEOUT', globalTimeout))
+
+    # get a threshold for which to report long running tests
+    if os.getenv("CHPL_TEST_EXEC_TIME_WARN_LIMIT"):
+        execTimeWarnLimit = int(os.getenv('CHPL_TEST_EXEC_TIME_WARN_LIMIT', '0'))
+    else:
+        execTimeWarnLimit = 0
+
+    # directory level timeout
+    if fileIndex.access('./TIMEOUT',os.R_OK):
+        directoryTimeout = ReadIntegerValue('./TIMEOUT', localdir)
+    else:
+        directoryTimeout = globalTimeout
+    # sys.stdout.write('globalTimeout=%d\n'%(globalTimeout))
+
+    # Check for global PERFTIMEEXEC option
+    timerFile = PerfDirFile('TIMEEXEC') # e.g. ./PERFTIMEEXEC
+    if os.access(timerFile, os.R_OK):
+        globalTimer = GetTimer(timerFile)
+    else:
+        globalTimer = None
+
+    # Get global timeout for kill
+    if fileIndex.access('./KILLTIMEOUT',os.R_OK):
+        globalKillTimeout = ReadIntegerValue('./KILLTIMEOUT', localdir)
+    else:
+        globalKillTimeout=10
+    # sys.stdout.write('globalKillTimeout=%d\n'%(globalKillTimeout))
+
+    if fileIndex.access('./NOEXEC',os.R_OK):
+        execute=False
+    else:
+        execute=True
+    # sys.stdout.write('execute=%d\n'%(execute))
+
+    if fileIndex.access('./NOVGRBIN',os.R_OK):
+        vgrbin=False
+    else:
+        vgrbin=True
+    # sys.stdout.write('vgrbin=%d\n'%(vgrbin))
+
+    if fileIndex.access('./COMPSTDIN',os.R_OK):
+        globalCompstdin='./COMPSTDIN'
+    else:
+        globalCompstdin='/dev/null'
+    # sys.stdout.write('globalCompstdin=%s\n'%(globalCompstdin))
+
+    globalLastcompopts=list();
+    if fileIndex.access('./LASTCOMPOPTS',os.R_OK):
+        globalLastcompopts+=subprocess.Popen(['cat', './LASTCOMPOPTS'], stdout=subprocess.PIPE, close_fds=True).communicate()[0].strip().split()
+    # sys.stdout.write('globalLastcompopts=%s\n'%(globalLastcompopts))
+
+    globalLastexecopts=list();
+    if fileIndex.access('./LASTEXECOPTS',os.R_OK):
+        globalLastexecopts+=subprocess.Popen(['cat', './LASTEXECOPTS'], stdout=subprocess.PIPE, close_fds=True).communicate()[0].strip().split()
+    # sys.stdout.write('globalLastexecopts=%s\n'%(globalLastexecopts))
+
+    if fileIndex.access(PerfDirFile('NUMLOCALES'),os.R_OK):
+        globalNumlocales=ReadIntegerValue(PerfDirFile('NUMLOCALES'), localdir)
+        # globalNumlocales.strip(globalNumlocales)
+    else:
+        # start_test sets this, so we'll assume it's right :)
+        globalNumlocales=int(os.getenv('NUMLOCALES', '0'))
+    # sys.stdout.write('globalNumlocales=%s\n'%(globalNumlocales))
+
+    if fileIndex.access('./CATFILES',os.R_OK):
+        globalCatfiles=subprocess.Popen(['cat', './CATFILES'], stdout=subprocess.PIPE, close_fds=True).communicate()[0]
+        globalCatfiles.strip(globalCatfiles)
+    else:
+        globalCatfiles=None
+    # sys.stdout.write('globalCatfiles=%s\n'%(globalCatfiles))
+
+
+    #
+    # valgrind stuff
+    #
+    chpl_valgrind_opts=os.getenv('CHPL_VALGRIND_OPTS', '--tool=memcheck')
+    # sys.stdout.write('chpl_valgrind_opts=%s\n'%(chpl_valgrind_opts))
+
+    if os.getenv('CHPL_TEST_VGRND_COMP')=='on':
+        valgrindcomp = 'valgrind'
+        valgrindcompopts=chpl_valgrind_opts.split()
+        valgrindcompopts+=['--gen-suppressions=all']
+        valgrindcompopts+=['--suppressions=%s/compiler/etc/valgrind.suppressions'%(chpl_home)]
+        valgrindcompopts+=['-q']
+    else:
+        valgrindcomp = None
+        valgrindcompopts = None
+    # sys.stdout.write('valgrindcomp=%s %s\n'%(valgrindcomp, valgrindcompopts))
+
+    if (os.getenv('CHPL_TEST_VGRND_EXE')=='on' and vgrbin):
+        valgrindbin = 'valgrind'
+        valgrindbinopts = chpl_valgrind_opts.split()+['-q']
+        if (chplcomm!='none'):
+            valgrindbinopts+=['--trace-children=yes']
+    else:
+        valgrindbin = None
+        valgrindbinopts = None
+    # sys.stdout.write('valgrindbin=%s %s\n'%(valgrindbin, valgrindbinopts))
+
+
+    #
+    # Misc set up
+    #
+
+    testfutures=string.atoi(os.getenv('CHPL_TEST_FUTURES','0'))
+    # sys.stdout.write('testfutures=%s\n'%(testfutures))
+
+    testnotests=os.getenv('CHPL_TEST_NOTESTS')
+    # sys.stdout.write('testnotests=%s\n'%(testnotests))
+
+    launchcmd=os.getenv('LAUNCHCMD')
+    # sys.stdout.write('launchcmd=%s\n'%(launchcmd))
+
+    if os.getenv('CHPL_TEST_INTERP')=='on':
+        execute=False
+        futureSuffix='.ifuture'
+    else:
+        futureSuffix='.future'
+    # sys.stdout.write('futureSuffix=%s\n'%(futureSuffix))
+
+    printpassesfile = None
+    if os.getenv('CHPL_TEST_COMP_PERF')!=None:
+        compperftest=True
+
+        # check for the main compiler performance directory
+        if os.getenv('CHPL_TEST_COMP_PERF_DIR')!=None:
+            compperfdir=os.getenv('CHPL_TEST_COMP_PERF_DIR')
+        else:
+            compperfdir=chpl_home+'/test/compperfdat/' 
+
+        # The env var CHPL_PRINT_PASSES_FILE will cause the 
+        # compiler to save the pass timings to specified file.
+        if os.getenv('CHPL_PRINT_PASSES_FILE')!=None:
+            printpassesfile=os.getenv('CHPL_PRINT_PASSES_FILE')
+        else:
+            printpassesfile='timing.txt'
+            os.putenv('CHPL_PRINT_PASSES_FILE', 'timing.txt')
+
+        # check for the perfkeys file
+        if os.getenv('CHPL_TEST_COMP_PERF_KEYS')!=None:
+            compperfkeyfile=os.getenv('CHPL_TEST_COMP_PERF_KEYS')
+        else: 
+            compperfkeyfile=chpl_home+'/test/performance/compiler/compilerPerformance.perfkeys'
+
+        # Check for the directory to store the tempory .dat files that will get 
+        # combined into one.    
+        if os.getenv('CHPL_TEST_COMP_PERF_TEMP_DAT_DIR')!=None:
+            tempDatFilesDir = os.getenv('CHPL_TEST_COMP_PERF_TEMP_DAT_DIR')
+        else: 
+            tempDatFilesDir = compperfdir + 'tempCompPerfDatFiles/'
+
+    else: 
+        compperftest=False
+
+    #
+    # Global COMPOPTS/PERFCOMPOPTS:
+    #
+    #   Prefer PERFCOMPOPTS if doing performance testing; otherwise, use
+    #   COMPOPTS.  Note that COMPOPTS is used for performance testing
+    #   currently in the absence of a PERFCOMPOPTS file.  Not sure whether
+    #   or not this is a good idea, but preserving it for now for backwards
+    #   compatibility.
+    #
+
+    directoryCompopts = list(' ')
+    if (perftest and fileIndex.access(PerfDirFile('COMPOPTS'),os.R_OK)): # ./PERFCOMPOPTS
+        directoryCompopts=ReadFileWithComments(PerfDirFile('COMPOPTS'))
+    elif fileIndex.access('./COMPOPTS',os.R_OK):
+        directoryCompopts=ReadFileWithComments('./COMPOPTS')
+
+    envCompopts = os.getenv('COMPOPTS')
+    if envCompopts is not None:
+        envCompopts = shlex.split(envCompopts)
+    else:
+      envCompopts = []
+
+    # Global CHPLDOCOPTS
+    if fileIndex.access('./CHPLDOCOPTS', os.R_OK):
+        dirChpldocOpts = shlex.split(ReadFileWithComments('./CHPLDOCOPTS')[0])
+    else:
+        dirChpldocOpts = []
+
+    # Env CHPLDOCOPTS
+    envChpldocOpts = os.getenv('CHPLDOCOPTS')
+    if envChpldocOpts is not None:
+        envChpldocOpts = shlex.split(envChpldocOpts)
+    else:
+        envChpldocOpts = []
+
+    # Global chpldoc options.
+    globalChpldocOpts = dirChpldocOpts + envChpldocOpts
+
+    #
+    # Global PERFNUMTRIALS
+    #
+    if perftest and fileIndex.access(PerfDirFile('NUMTRIALS'), os.R_OK): # ./PERFNUMTRIALS
+        globalNumTrials = ReadIntegerValue(PerfDirFile('NUMTRIALS'), localdir)
+    else:
+        globalNumTrials=int(os.getenv('CHPL_TEST_NUM_TRIALS', '1'))
+
+    #
+    # Global EXECENV
+    #
+    if fileIndex.access('./EXECENV',os.R_OK):
+        globalExecenv=ReadFileWithComments('./EXECENV')
+    else:
+        globalExecenv=list()
+    # sys.stdout.write('globalExecenv=%s\n'%(globalExecenv))
+
+    #
+    # Global EXECOPTS/PERFEXECOPTS
+    #
+    #
+    #   Prefer PERFEXECOPTS if doing performance testing; otherwise, use
+    #   EXECOPTS.  Note that EXECOPTS is used for performance testing
+    #   currently in the absence of a PERFEXECOPTS file.  Not sure whether
+    #   or not this is a good idea, but preserving it for now for backwards
+    #   compatibility.
+    #
+    if (perftest and fileIndex.access(PerfDirFile('EXECOPTS'),os.R_OK)): # ./PERFEXECOPTS
+        tgeo=ReadFileWithComments(PerfDirFile('EXECOPTS'))
+        globalExecopts= shlex.split(tgeo[0])
+    elif fileIndex.access('./EXECOPTS',os.R_OK):
+        tgeo=ReadFileWithComments('./EXECOPTS')
+        globalExecopts= shlex.split(tgeo[0])
+    else:
+        globalExecopts=list()
+    envExecopts = os.getenv('EXECOPTS')
+    # sys.stdout.write('globalExecopts=%s\n'%(globalExecopts))
+
+    #
+    # Global PRECOMP, PREDIFF & PREEXEC
+    #
+    if fileIndex.access('./PRECOMP', os.R_OK|os.X_OK):
+        globalPrecomp='./PRECOMP'
+    else:
+        globalPrecomp=None
+    #
+    if fileIndex.access('./PREDIFF',os.R_OK|os.X_OK):
+        globalPrediff='./PREDIFF'
+    else:
+        globalPrediff=None
+    # sys.stdout.write('globalPrediff=%s\n'%(globalPrediff))
+    if fileIndex.access('./PREEXEC',os.R_OK|os.X_OK):
+        globalPreexec='./PREEXEC'
+    else:
+        globalPreexec=None
+    #
+    # Start running tests
+    #
+    sys.stdout.write('[Starting subtest - %s]\n'%(time.strftime('%a %b %d %H:%M:%S %Z %Y', time.localtime())))
+    #sys.stdout.write('[compiler: \'%s\']\n'%(compiler))
+    if systemPreexec:
+        sys.stdout.write("[system-wide preexec: '{0}']\n".format(systemPreexec))
+    if systemPrediff:
+        sys.stdout.write('[system-wide prediff: \'%s\']\n'%(systemPrediff))
+
+    # consistently look only at the files in the current directory
+    dirlist=fileIndex.listdir()
+
+    onetestsrc = os.getenv('CHPL_ONETEST')
+    if onetestsrc==None:
+        testsrc=filter(IsChplTest, dirlist)
+    else:
+        testsrc=list()
+        testsrc.append(onetestsrc)
+
+    original_compiler = compiler
+
+
+
+# Compile, execute and check all versions of one test
+def run_test(testname):
+    sys.stdout.flush()
+
+    compiler = original_compiler
+    compstdin = globalCompstdin
+
+    # print testname
+    sys.stdout.write('[test: %s/%s]\n'%(localdir,testname))
+    test_filename = re.match(r'^(.*)\.(?:chpl|test\.c)$', testname).group(1)
+    execname = test_filename
+    if uniquifyTests:
+        execname += '.{0}'.format(os.getpid())
+    # print test_filename
+
+    if re.match(r'^.+\.test\.c$', testname):
+      is_c_test = True
+    else:
+      is_c_test = False
+
+    # If the test name ends with .doc.chpl or the compiler was set to chpldoc
+    # (i.e. is_chpldoc=True), run this test with chpldoc options.
+    if testname.endswith('.doc.chpl') or is_chpldoc:
+        test_is_chpldoc = True
+    else:
+        test_is_chpldoc = False
+
+    # Test specific settings
+    catfiles = globalCatfiles
+    numlocales = globalNumlocales
+    lastcompopts = list()
+    if globalLastcompopts:
+        lastcompopts += globalLastcompopts
+    # sys.stdout.write("lastcompopts=%s\n"%(lastcompopts))
+    lastexecopts = list()
+    if globalLastexecopts:
+        lastexecopts += globalLastexecopts
+    # sys.stdout.write("lastexecopts=%s\n"%(lastexecopts))
+
+    # Get the list of files starting with 'test_filename.'
+    test_filename_files = fnmatch.filter(dirlist, test_filename+'.*')
+    # print test_filename_files, dirlist
+
+    if (perftest and (test_filename_files.count(PerfTFile(test_filename,'keys'))==0) and
+        (test_filename_files.count(PerfTFile(test_filename,'execopts'))==0)):
+        sys.stdout.write('[Skipping noperf test: %s/%s]\n'%(localdir,test_filename))
+        return # on to next test
+
+    timeout = directoryTimeout
+    killtimeout = globalKillTimeout
+    numTrials = globalNumTrials
+    if (perftest):
+        timer = globalTimer
+    else:
+        timer = None
+    futuretest=''
+
+    if test_is_chpldoc or is_chpl_ipe:
+        executebin = False
+    else:
+        executebin = execute
+
+    testfuturesfile=False
+    testskipiffile=False
+    noexecfile=False
+    execoptsfile=False
+    precomp=None
+    prediff=None
+    preexec=None
+
+    if os.getenv('CHPL_NO_STDIN_REDIRECT') == None:
+        redirectin = '/dev/null'
+    else:
+        redirectin = None
+
+    # If there is a .skipif file, put it at front of list.
+    skipif_i = -1
+    for i, test_filename_file in enumerate(test_filename_files):
+        if test_filename_file.endswith('.skipif'):
+            skipif_i = i
+            break
+    if skipif_i > 0:
+        test_filename_files.insert(0, test_filename_files.pop(skipif_i))
+
+    # Deal with these files
+    do_not_test=False
+    for f in test_filename_files:
+        (root, suffix) = os.path.splitext(f)
+        # sys.stdout.write("**** %s ****\n"%(f))
+
+        # 'f' is of the form test_filename.SOMETHING.suffix,
+        # not pertinent at the moment
+        if root != test_filename:
+            continue
+
+        # Deal with these later
+        if (suffix == '.good' or
+            suffix=='.compopts' or suffix=='.perfcompopts' or
+            suffix=='.chpldocopts' or
+            suffix=='.execenv' or suffix=='.perfexecenv' or
+            suffix=='.execopts' or suffix=='.perfexecopts'):
+            continue # on to next file
+
+        elif (suffix=='.notest' and (fileIndex.access(f, os.R_OK) and
+                                     testnotests=='0')):
+            sys.stdout.write('[Skipping notest test: %s/%s]\n'%(localdir,test_filename))
+            do_not_test=True
+            break
+
+        elif (suffix=='.skipif' and (fileIndex.access(f, os.R_OK) and
+               (os.getenv('CHPL_TEST_SINGLES')=='0'))):
+            testskipiffile=True
+            skiptest=runSkipIf(f)
+            try:
+                skipme=False
+                if skiptest.strip() != "False":
+                    skipme = skiptest.strip() == "True" or int(skiptest) == 1
+                if skipme:
+                    sys.stdout.write('[Skipping test based on .skipif environment settings: %s/%s]\n'%(localdir,test_filename))
+                    do_not_test=True
+            except ValueError:
+                sys.stdout.write('[Error processing .skipif file %s/%s]\n'%(localdir,f))
+                do_not_test=True
+            if do_not_test:
+                break
+
+        elif (suffix=='.suppressif' and (fileIndex.access(f, os.R_OK))):
+            suppresstest=runSkipIf(f)
+            try:
+                suppressme=False
+                if suppresstest.strip() != "False":
+                    suppressme = suppresstest.strip() == "True" or int(suppresstest) == 1
+                if suppressme:
+                    suppressline = ""
+                    with open('./'+test_filename+'.suppressif', 'r') as suppressfile:
+                        for line in suppressfile:
+                            line = line.strip()
+                            if (line.startswith("#") and
+                                not line.startswith("#!")):
+                                suppressline = line.replace('#','').strip()
+                                break
+                    futuretest='Suppress (' + suppressline + ') '
+            except ValueError:
+                sys.stdout.write('[Error processing .suppressif file %s/%s]\n'%(localdir,f))
+
+        elif (suffix==timeoutsuffix and fileIndex.access(f, os.R_OK)):
+            timeout=ReadIntegerValue(f, localdir)
+            sys.stdout.write('[Overriding default timeout with %d]\n'%(timeout))
+        elif (perftest and suffix==PerfSfx('timeexec') and fileIndex.access(f, os.R_OK)): #e.g. .perftimeexec
+            timer = GetTimer(f)
+
+        elif (perftest and suffix==PerfSfx('numtrials') and fileIndex.access(f, os.R_OK)): #e.g. .perfnumtrials
+            numTrials = ReadIntegerValue(f, localdir)
+
+        elif (suffix=='.killtimeout' and fileIndex.access(f, os.R_OK)):
+            killtimeout=ReadIntegerValue(f, localdir)
+
+        elif (suffix=='.catfiles' and fileIndex.access(f, os.R_OK)):
+            execcatfiles=subprocess.Popen(['cat', f], stdout=subprocess.PIPE, close_fds=True).communicate()[0].strip()
+            if catfiles:
+                catfiles+=execcatfiles
+            else:
+                catfiles=execcatfiles
+
+        elif (suffix=='.lastcompopts' and fileIndex.access(f, os.R_OK)):
+            lastcompopts+=subprocess.Popen(['cat', f], stdout=subprocess.PIPE, close_fds=True).communicate()[0].strip().split()
+            # sys.stdout.write("lastcompopts=%s\n"%(lastcompopts))
+
+        elif (suffix=='.lastexecopts' and fileIndex.access(f, os.R_OK)):
+            lastexecopts+=subprocess.Popen(['cat', f], stdout=subprocess.PIPE, close_fds=True).communicate()[0].strip().split()
+            # sys.stdout.write("lastexecopts=%s\n"%(lastexecopts))
+
+        elif (suffix==PerfSfx('numlocales') and fileIndex.access(f, os.R_OK)):
+            numlocales=ReadIntegerValue(f, localdir)
+
+        elif suffix==futureSuffix and fileIndex.access(f, os.R_OK):
+            with open('./'+test_filename+futureSuffix, 'r') as futurefile:
+                futuretest='Future ('+futurefile.readline().strip()+') '
+
+        elif (suffix=='.noexec' and fileIndex.access(f, os.R_OK)):
+            noexecfile=True
+            executebin=False
+
+        elif (suffix=='.precomp' and fileIndex.access(f, os.R_OK|os.X_OK)):
+            precomp=f
+
+        elif (suffix=='.prediff' and fileIndex.access(f, os.R_OK|os.X_OK)):
+            prediff=f
+
+        elif (suffix=='.preexec' and fileIndex.access(f, os.R_OK|os.X_OK)):
+            preexec=f
+
+        elif (suffix=='.stdin' and fileIndex.access(f, os.R_OK)):
+            if redirectin == None:
+                sys.stdout.write('[Skipping test with .stdin input since -nostdinredirect is given: %s/%s]\n'%(localdir,test_filename))
+                do_not_test=True
+                break
+            else:
+                # chpl-ipe only has a "compile" step, so any stdin needs to be
+                # passed to compiler.
+                if is_chpl_ipe:
+                    compstdin = f
+                else:
+                    redirectin = f
+
+        if suffix==futureSuffix:
+            testfuturesfile=True
+
+    del test_filename_files
+
+    # Skip to the next test
+    if do_not_test:
+        return # on to next test
+
+    # 0: test no futures
+    if testfutures == 0 and testfuturesfile == True:
+        sys.stdout.write('[Skipping future test: %s/%s]\n'%(localdir,test_filename))
+        return # on to next test
+    # 1: test all futures
+    elif testfutures == 1:
+        pass
+    # 2: test only futures
+    elif testfutures == 2 and testfuturesfile == False:
+        sys.stdout.write('[Skipping non-future test: %s/%s]\n'%(localdir,test_filename))
+        return # on to next test
+    # 3: test futures that have a .skipif file
+    elif testfutures == 3 and testfuturesfile == True and testskipiffile == False:
+        sys.stdout.write('[Skipping future test without a skipif: %s/%s]\n'%(localdir,test_filename))
+        return # on to next test
+
+    # c tests don't have a way to launch themselves
+    if is_c_test and chpllauncher != 'none':
+        sys.stdout.write('[Skipping c test: %s/%s]\n'%(localdir,test_filename))
+        return
+
+    # Set numlocales
+    if (numlocales == 0) or (chplcomm=='none') or is_c_test:
+        numlocexecopts = None
+    else:
+        numlocexecopts = ' -nl '+str(numlocales)
+
+    # if any performance test has a timeout longer than the default we only
+    # want to run it once
+    if (timeout > globalTimeout):
+        if numTrials != 1:
+            sys.stdout.write('[Lowering number of trials for {0} to 1]\n'.format(test_filename))
+            numTrials = 1
+
+    # Get list of test specific compiler options
+    # Default to [' ']
+    compoptslist = list(' ')
+
+    chpldoc_opts_filename = test_filename + chpldocsuffix
+    if test_is_chpldoc and fileIndex.access(chpldoc_opts_filename, os.R_OK):
+        compoptslist = ReadFileWithComments(chpldoc_opts_filename, False)
+        if not compoptslist:
+            sys.stdout.write('[Warning: ignoring an empty chpldocopts file %s]\n' %
+                             (test_filename+compoptssuffix))
+    elif fileIndex.access(test_filename+compoptssuffix, os.R_OK):
+        compoptslist = ReadFileWithComments(test_filename+compoptssuffix, False)
+        if not compoptslist:
+            # cf. for execoptslist no warning is issued
+            sys.stdout.write('[Warning: ignoring an empty compopts file %s]\n'%(test_filename+compoptssuffix))
+
+    # Merge global compopts list with local compopts.
+    # Use the "product" of the two if they are both provided.
+    usecompoptslist = [ ]
+    # Note -- this could use itertools.product
+    for dir_compopts in directoryCompopts:
+        for file_compopts in compoptslist:
+            useopt = [dir_compopts, file_compopts]
+            usearg = ' '.join(useopt)
+            # But change all-spaces into single space.
+            if usearg.strip() == '':
+              usearg = ' '
+            usecompoptslist += [usearg]
+    compoptslist = usecompoptslist
+
+    # The test environment is that of this process, augmented as specified
+    if fileIndex.access(test_filename+execenvsuffix, os.R_OK):
+        execenv = ReadFileWithComments(test_filename+execenvsuffix)
+    else:
+        execenv = list()
+
+    testenv = {}
+    if len(globalExecenv)!=0 or len(execenv)!=0:
+        for tev in globalExecenv:
+            testenv[tev.split('=')[0].strip()] = tev.split('=')[1].strip()
+        for tev in execenv:
+            testenv[tev.split('=')[0].strip()] = tev.split('=')[1].strip()
+        del tev
+
+    # Get list of test specific exec options
+    if fileIndex.access(test_filename+execoptssuffix, os.R_OK):
+        execoptsfile=True
+        execoptslist = ReadFileWithComments(test_filename+execoptssuffix, False)
+    else:
+        execoptslist = list()
+    # Handle empty execopts list
+    if len(execoptslist) == 0:
+        # cf. for compoptslist, a warning is issued in this case
+        execoptslist.append(' ')
+
+    if (os.getenv('CHPL_TEST_INTERP')=='on' and
+        (noexecfile or testfuturesfile or execoptsfile)):
+        sys.stdout.write('[Skipping interpretation of: %s/%s]\n'%(localdir,test_filename))
+        return # on to next test
+
+    clist = list()
+    curFileTestStart = time.time()
+
+    # For all compopts + execopts combos..
+    compoptsnum = 0
+    for compopts in compoptslist:
+        sys.stdout.flush()
+        del clist
+        # use the remaining portion as a .good file for executing tests
+        #  clist will be *added* to execopts if it is empty, or just used
+        #  as the default .good file if not empty
+        clist = compopts.split('#')
+        if len(clist) >= 2:
+            compopts = clist.pop(0)
+            cstr = ' #' + '#'.join(clist)
+            del clist[:]
+            clist.append(cstr)
+        else:
+            del clist[:]
+
+        if compopts == ' ':
+            complog=execname+'.comp.out.tmp'
+        else:
+            compoptsnum += 1
+            complog = execname+'.'+str(compoptsnum)+'.comp.out.tmp'
+
+        #
+        # Run the precompile script
+        #
+        if globalPrecomp:
+            sys.stdout.write('[Executing ./PRECOMP]\n')
+            sys.stdout.flush()
+            sys.stdout.write(subprocess.Popen(['./PRECOMP',
+                                              execname,complog,compiler],
+                                              stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+        if precomp:
+            sys.stdout.write('[Executing precomp %s.precomp]\n'%(test_filename))
+            sys.stdout.flush()
+            sys.stdout.write(subprocess.Popen(['./'+test_filename+'.precomp',
+                                              execname,complog,compiler],
+                                              stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+        # the scripts could have made files for the test to use
+        if globalPrecomp or precomp:
+            fileIndex.refresh()
+
+
+        #
+        # Build the test program
+        #
+        args = []
+        if test_is_chpldoc:
+            args += globalChpldocOpts + shlex.split(compopts)
+        elif is_chpl_ipe:
+            # No arguments work for chpl-ipe as of 2015-04-08. (thomasvandoren)
+            # TODO: When chpl-ipe does support command line flags, decide if it
+            #       will use COMPOPTS/.compopts or some other filename.
+            #       (thomasvandoren, 2015-04-08)
+            pass
+        else:
+            args += ['-o', execname] + envCompopts + shlex.split(compopts)
+        args += [testname]
+
+        if is_c_test:
+            # we need to drop envCompopts for C tests as those are options
+            # for `chpl` so don't include them here
+            args = ['-o', test_filename]+shlex.split(compopts)+[testname]
+            cmd = c_compiler
+        else:
+            if test_is_chpldoc and not compiler.endswith('chpldoc'):
+                # For tests with .doc.chpl suffix, use chpldoc compiler. Update
+                # the compopts accordingly. Add 'doc' prefix to existing compiler.
+                compiler += 'doc'
+                cmd = compiler
+
+                if which(cmd) is None:
+                    sys.stdout.write(
+                        '[Warning: Could not find chpldoc, skipping test '
+                        '{0}/{1}]\n'.format(localdir, test_filename))
+                    break
+
+            if valgrindcomp:
+                cmd = valgrindcomp
+                args = valgrindcompopts+[compiler]+args
+            else:
+                cmd = compiler
+
+        if lastcompopts:
+            args += lastcompopts
+
+        compStart = time.time()
+        #
+        # Compile (with timeout)
+        #
+        # compilation timeout defaults to 2 * execution timeout.
+        # This is to quiet compilation timeouts in some oversubscribed test
+        # configurations (since they are generating a lot of testing noise, but
+        # don't represent a real issue.)
+        #
+        # TODO (Elliot 02/27/15): Ideally what we want is separate options for
+        # compiler and testing timeout, but that's more work to thread through
+        # sub_test right now and this is causing a lot of noise in nightly
+        # testing. Hopefully this is just a temporary work around and I'll
+        # remember to add the cleaner solution soon.
+        #
+        comptimeout = 2*timeout
+        cmd=ShellEscapeCommand(cmd);
+        sys.stdout.write('[Executing compiler %s'%(cmd))
+        if args:
+            sys.stdout.write(' %s'%(' '.join(args)))
+        sys.stdout.write(' < %s]\n'%(compstdin))
+        sys.stdout.flush()
+        # Compilations whose timing or side effects are the point of the
+        #  test are never cached or shared, nor are those a precomp script
+        #  could have changed the sources of
+        cacheKey = None
+        sharedKey = None
+        if (not is_c_test and not test_is_chpldoc and not is_chpl_ipe and
+                not compperftest and not valgrindcomp and
+                compile_cache.reusable(args)):
+            sources = compile_cache.source_digest(fileIndex)
+            if sources and not globalPrecomp and not precomp:
+                sharedKey = sharedBuilds.key(cmd, args, execname, sources)
+            if sources and compileCache:
+                cacheKey = compileCache.key(cmd, args, execname, chpl_home,
+                                            sources)
+        cached = sharedKey and sharedBuilds.get(sharedKey, execname)
+        if not cached:
+            cached = cacheKey and compileCache.get(cacheKey, execname)
+        if cached:
+            sys.stdout.write('[Using cached compilation]\n')
+            (output, status) = cached
+        elif useTimedExec:
+            wholecmd = cmd+' '+' '.join(map(ShellEscape, args))
+            p = subprocess.Popen([timedexec, str(comptimeout), wholecmd],
+                                 stdin=open(compstdin, 'r'),
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, close_fds=True)
+            output = p.communicate()[0]
+            status = p.returncode
+        else:
+            # cmd is escaped for the shell timedexec runs it with
+            p = supervise.popen(shlex.split(cmd)+args,
+                                stdin=open(compstdin, 'r'))
+            child = supervisor.run(p, comptimeout, killtimeout)
+            output = child.output
+            status = child.status
+
+        if status == supervise.TIMEOUT_STATUS:
+            sys.stdout.write('%s[Error: Timed out compilation for %s/%s'%
+                             (futuretest, localdir, test_filename))
+            printTestVariation(compoptsnum, compoptslist);
+            sys.stdout.write(']\n')
+            cleanup(execname)
+            cleanup(printpassesfile)
+            continue # on to next compopts
+
+        if sharedKey and not cached:
+            sharedBuilds.put(sharedKey, execname, output, status)
+        if cacheKey and not cached:
+            compileCache.put(cacheKey, execname, output, status)
+
+        elapsedCompTime = time.time() - compStart
+        test_name = os.path.join(localdir, test_filename)
+        if compoptsnum != 0:
+            test_name += ' (compopts: {0})'.format(compoptsnum)
+
+        print('[Elapsed compilation time for "{0}" - {1:.3f} '
+            'seconds]'.format(test_name, elapsedCompTime))
+
+        # remove some_file: output from C compilers
+        if is_c_test:
+          for arg in args:
+            if arg.endswith(".c"):
+              # remove lines like
+              # somefile.c:
+              # that some C compilers emit when compiling multiple files
+              output = output.replace(arg + ":\n", "");
+
+        if (status!=0 or not executebin):
+            # Save original output
+            origoutput = output;
+
+            # Compare compiler output with expected program output
+            if catfiles:
+                sys.stdout.write('[Concatenating extra files: %s]\n'%
+                                 (test_filename+'.catfiles'))
+                sys.stdout.flush()
+                output+=subprocess.Popen(['cat']+catfiles.split(),
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT, close_fds=True).communicate()[0]
+
+            # Sadly these scripts require an actual file
+            complogfile=file(complog, 'w')
+            complogfile.write('%s'%(output))
+            complogfile.close()
+
+            if globalPrediff:
+                sys.stdout.write('[Executing ./PREDIFF]\n')
+                sys.stdout.flush()
+                sys.stdout.write(subprocess.Popen(['./PREDIFF',
+                                                   execname,complog,compiler,
+                                                   ' '.join(envCompopts)+' '+compopts,
+                                                   ' '.join(args)],
+                                                  stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+            if prediff:
+                sys.stdout.write('[Executing prediff %s.prediff]\n'%(test_filename))
+                sys.stdout.flush()
+                sys.stdout.write(subprocess.Popen(['./'+test_filename+'.prediff',
+                                                   execname,complog,compiler,
+                                                   ' '.join(envCompopts)+' '+compopts,
+                                                   ' '.join(args)],
+                                                  stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+            # the scripts could have made the .good file
+            if globalPrediff or prediff:
+                fileIndex.refresh()
+
+            # find the compiler .good file to compare against. The compiler
+            # .good file can be of the form testname.<configuration>.good or
+            # explicitname.<configuration>.good. It's not currently setup to
+            # handle testname.<configuration>.<compoptsnum>.good, but that
+            # would be easy to add. 
+            basename = test_filename 
+            if len(clist) != 0:
+                explicitcompgoodfile = clist[0].split('#')[1].strip()
+                basename = explicitcompgoodfile.replace('.good', '')
+
+            goodfile = FindGoodFile(basename)
+            # sys.stdout.write('default goodfile=%s\n'%(goodfile))
+
+            if not fileIndex.isfile(goodfile) or not fileIndex.access(goodfile, os.R_OK):
+                sys.stdout.write('[Error cannot locate compiler output comparison file %s/%s]\n'%(localdir, goodfile))
+                sys.stdout.write('[Compiler output was as follows:]\n')
+                sys.stdout.write(origoutput)
+                cleanup(execname)
+                cleanup(printpassesfile)
+                continue # on to next compopts
+
+            result = DiffFiles(goodfile, complog)
+            if result==0:
+                os.unlink(complog)
+                sys.stdout.write('%s[Success '%(futuretest))
+            else:
+                sys.stdout.write('%s[Error '%(futuretest))
+            sys.stdout.write('matching compiler output for %s/%s'%
+                                 (localdir, test_filename))
+            printTestVariation(compoptsnum, compoptslist);
+            sys.stdout.write(']\n')
+
+            if (result != 0 and futuretest != ''):
+                badfile=test_filename+'.bad'
+                if fileIndex.access(badfile, os.R_OK):
+                    badresult = DiffBadFiles(badfile, complog)
+                    if badresult==0:
+                        os.unlink(complog);
+                        sys.stdout.write('[Clean match against .bad file ')
+                    else:
+                        # bad file doesn't match, which is bad
+                        sys.stdout.write('[Error matching .bad file ')
+                    sys.stdout.write('for %s/%s'%(localdir, test_filename))
+                    printTestVariation(compoptsnum, compoptslist);
+                    sys.stdout.write(']\n');
+
+            cleanup(execname)
+            cleanup(printpassesfile)
+            continue # on to next compopts
+        else:
+            if executionTurns:
+                executionTurns.wait(testname)
+
+            compoutput = output # save for diff
+
+            exec_log_names = []
+
+            # Exactly one execution output file.
+            if len(compoptslist) == 1 and len(execoptslist) == 1:
+                exec_log_names.append(get_exec_log_name(execname))
+
+            # One execution output file for the current compiler opt.
+            elif len(compoptslist) > 1 and len(execoptslist) == 1:
+                exec_opts_num_tmp = 1
+                if execoptslist[0] == ' ':
+                    exec_opts_num_tmp = 0
+                exec_log_names.append(get_exec_log_name(execname, compoptsnum, exec_opts_num_tmp))
+
+            # One execution output file for each of the execution opts.
+            elif len(compoptslist) == 1 and len(execoptslist) > 1:
+                for i in xrange(1, len(execoptslist) + 1):
+                    exec_log_names.append(get_exec_log_name(execname, compoptsnum, i))
+
+            # This enumerates the cross product of all compiler and execution
+            # opts. It's not clear whether this is actually supported elsewhere
+            # (like start_test), but it's here.
+            else:
+                for i in xrange(1, len(execoptslist) + 1):
+                    exec_log_names.append(get_exec_log_name(execname, compoptsnum, i))
+
+            # Write the log(s), so it/they can be modified by preexec.
+            for exec_log_name in exec_log_names:
+                with open(exec_log_name, 'w') as execlogfile:
+                    execlogfile.write(compoutput)
+
+        #
+        # Compile successful
+        #
+        sys.stdout.write('[Success compiling %s/%s]\n'%(localdir, test_filename))
+
+        # Note that compiler performance only times successful compilations. 
+        # Tests that are designed to fail before compilation is complete will 
+        # not get timed, so the total time compiling might be off slightly.   
+        if compperftest and not is_c_test:
+            # make the compiler performance directories if they don't exist 
+            timePasses = True
+            if not os.path.isdir(compperfdir) and not os.path.isfile(compperfdir):
+                os.makedirs(compperfdir)
+            if not os.access(compperfdir, os.R_OK|os.X_OK):
+                sys.stdout.write('[Error creating compiler performance test directory %s]\n'%(compperfdir))
+                timePasses = False
+
+            if not os.path.isdir(tempDatFilesDir) and not os.path.isfile(tempDatFilesDir):
+                os.makedirs(tempDatFilesDir)
+            if not os.access(compperfdir, os.R_OK|os.X_OK):
+                sys.stdout.write('[Error creating compiler performance temp dat file test directory %s]\n'%(tempDatFilesDir))
+                timePasses = False
+
+            # so long as we have to the directories 
+            if timePasses: 
+                # We need to name the files differently for each compiler
+                # option. 0 is the default compoptsnum if there are no options
+                # listed so we don't need to clutter the names with that
+                compoptsstring = str(compoptsnum)
+                if compoptsstring == '0':
+                    compoptsstring = ''
+
+                # make the datFileName the full path with / replaced with ~~ so
+                # we can keep the full path for later but not create a bunch of
+                # new directories.
+                datFileName = localdir.replace('/', '~~') + '~~' + test_filename + compoptsstring
+
+                # computePerfStats for the current test
+                sys.stdout.write('[Executing computePerfStats %s %s %s %s %s]\n'%(datFileName, tempDatFilesDir, compperfkeyfile, printpassesfile, 'False'))
+                sys.stdout.flush()
+                compkeysOutput = StringIO.StringIO()
+                status = computePerfStats.compute_perf_stats(
+                    datFileName, tempDatFilesDir, compperfkeyfile,
+                    printpassesfile, False, out=compkeysOutput)
+                compkeysOutput = compkeysOutput.getvalue()
+                datFiles = [tempDatFilesDir+'/'+datFileName+'.dat',  tempDatFilesDir+'/'+datFileName+'.error']
+
+                if status == 0:
+                    sys.stdout.write('[Success finding compiler performance keys for %s/%s]\n'% (localdir, test_filename))
+                else:
+                    sys.stdout.write('[Error finding compiler performance keys for %s/%s.]\n'% (localdir, test_filename))
+                    printTestVariation(compoptsnum, compoptslist);
+                    sys.stdout.write('computePerfStats output was:\n%s\n'%(compkeysOutput))
+                    sys.stdout.flush()
+                    sys.stdout.write('Deleting .dat files for %s/%s because of failure to find all keys\n'%(localdir, test_filename))
+                    for datFile in datFiles:
+                        if os.path.isfile(datFile):
+                            os.unlink(datFile)
+
+            #delete the timing file     
+            cleanup(printpassesfile)
+
+
+        if os.getenv('CHPL_COMPONLY'):
+            sys.stdout.write('[Note: Not executing or comparing the output due to -noexec flags]\n')
+            cleanup(execname)
+            continue # on to next compopts
+        explicitcompgoodfile = None
+        # Execute the test for all requested execopts
+        execoptsnum = 0
+        if len(clist)!=0:
+            if len(clist[0].split('#')) > 1:
+                explicitcompgoodfile = clist[0].split('#')[1].strip()
+        redirectin_set_in_loop = False
+        redirectin_original_value = redirectin
+        for texecopts in execoptslist:
+            sys.stdout.flush()
+
+            # Reset redirectin, in case execopts has multiple lines with
+            # different stdin files.
+            if redirectin_set_in_loop:
+                redirectin = redirectin_original_value
+                redirectin_set_in_loop = False
+            if (len(compoptslist)==1) and (len(execoptslist)==1):
+                onlyone = True
+                execlog = get_exec_log_name(execname)
+            else:
+                onlyone = False
+                if texecopts != ' ':
+                    execoptsnum += 1
+                execlog = get_exec_log_name(execname, compoptsnum, execoptsnum)
+
+            tlist = texecopts.split('#')
+            execopts = tlist[0].strip()
+
+            if numlocexecopts != None:
+                execopts += numlocexecopts;
+            if len(tlist) > 1:
+                # Ignore everything after the first token
+                explicitexecgoodfile = tlist[1].strip().split()[0]
+            else:
+                explicitexecgoodfile = explicitcompgoodfile
+            del tlist
+
+            if systemPreexec:
+                sys.stdout.write('[Executing system-wide preexec]\n')
+                sys.stdout.flush()
+                sys.stdout.write(subprocess.Popen([systemPreexec,
+                                                   execname,execlog,compiler],
+                                                  stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+            if globalPreexec:
+                sys.stdout.write('[Executing ./PREEXEC]\n')
+                sys.stdout.flush()
+                sys.stdout.write(subprocess.Popen(['./PREEXEC',
+                                                   execname,execlog,compiler],
+                                                  stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+            if preexec:
+                sys.stdout.write('[Executing preexec %s.preexec]\n'%(test_filename))
+                sys.stdout.flush()
+                sys.stdout.write(subprocess.Popen(['./'+test_filename+'.preexec',
+                                                   execname,execlog,compiler],
+                                                  stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+            if systemPreexec or globalPreexec or preexec:
+                fileIndex.refresh()
+
+            pre_exec_output = ''
+            if os.path.exists(execlog):
+                with open(execlog, 'r') as exec_log_file:
+                    pre_exec_output = exec_log_file.read()
+
+            if not os.access(execname, os.R_OK|os.X_OK):
+                sys.stdout.write('%s[Error could not locate executable %s for %s/%s'%
+                                 (futuretest, execname, localdir, test_filename))
+                printTestVariation(compoptsnum, compoptslist,
+                                   execoptsnum, execoptslist)
+                sys.stdout.write(']\n')
+                break; # on to next compopts
+
+            # When doing whole program execution, we want to time the _real
+            # binary for launchers that use a queue so we don't include the
+            # time to get the reservation. These are the launchers known to
+            # support timing the _real using CHPL_LAUNCHER_REAL_WRAPPER.
+            timereal = chpllauncher in ['pbs-aprun', 'aprun', 'slurm-srun']
+
+            args=list()
+            if timer and timereal:
+                cmd='./'+execname
+                testenv['CHPL_LAUNCHER_REAL_WRAPPER'] = timer
+            elif timer:
+                cmd=timer
+                args+=['./'+execname]
+            elif valgrindbin:
+                cmd=valgrindbin
+                args+=valgrindbinopts+['./'+execname]
+            else:
+                cmd='./'+execname
+
+            # if we're using a launchcmd, build up the command to call
+            # launchcmd, and have it run the cmd and args built above
+            if launchcmd:
+                # have chpl_launchcmd time execution and place results in a
+                # file since sub_test time will include time to get reservation
+                launchcmd_exec_time_file = execname + '_launchcmd_exec_time.txt'
+                testenv['CHPL_LAUNCHCMD_EXEC_TIME_FILE'] = launchcmd_exec_time_file
+
+                # save old cmd and args and add them after launchcmd args.
+                oldcmd = cmd
+                oldargs = list(args)
+                launch_cmd_list = shlex.split(launchcmd)
+                cmd = launch_cmd_list[0]
+                args = launch_cmd_list[1:]
+                args += [oldcmd]
+                args += oldargs
+
+            args+=globalExecopts
+            args+=shlex.split(execopts)
+            # envExecopts are meant for chpl programs, dont add them to C tests
+            if not is_c_test and envExecopts != None:
+                args+=shlex.split(envExecopts)
+            if lastexecopts:
+                args += lastexecopts
+            # sys.stdout.write("args=%s\n"%(args))
+
+            if len(args) >= 2 and '<' in args:
+              redirIdx = args.index('<')
+              execOptRedirect = args[redirIdx + 1]
+              args.pop(redirIdx+1)
+              args.pop(redirIdx)
+              if redirectin == None:
+                  # It is a little unfortunate that we compile the test only to skip it here.
+                  # In order to prevent this, the logic for combining all the places execpopts
+                  # come from and checking for '<' would have to be factored out or duplicated
+                  print('[Skipping test with stdin redirection ("<") in execopts since '
+                        '-nostdinredirect is given {0}/{1}]'.format(localdir, test_filename))
+                  break;
+              elif redirectin == "/dev/null":
+                if fileIndex.access(execOptRedirect, os.R_OK):
+                  redirectin = execOptRedirect
+                  redirectin_set_in_loop = True
+                else:
+                  sys.stdout.write('[Error: redirection file %s does not exist]\n'%(execOptRedirect))
+                  break
+              else:
+                sys.stdout.write('[Error: a redirection file already exists: %s]\n'%(redirectin))
+                break
+
+            #
+            # Run program (with timeout)
+            #
+            for count in xrange(numTrials):
+                exectimeout = False  # 'exectimeout' is specific to one trial of one execopt setting
+                launcher_error = ''  # used to suppress output/timeout errors whose root cause is a launcher error
+                sys.stdout.write('[Executing program %s %s'%(cmd, ' '.join(args)))
+                if redirectin:
+                    sys.stdout.write(' < %s'%(redirectin))
+                sys.stdout.write(']\n')
+                sys.stdout.flush()
+
+                # each trial's log starts from what the preexec scripts
+                # wrote, not from what an earlier trial left
+                with open(execlog, 'w') as execlogfile:
+                    execlogfile.write(pre_exec_output)
+
+                execStart = time.time()
+                # whether the output has been written to execlog already
+                outputLogged = False
+                if useLauncherTimeout:
+                    if redirectin == None:
+                        my_stdin = None
+                    else:
+                        my_stdin=file(redirectin, 'r')
+                    test_command = [cmd] + args + LauncherTimeoutArgs(timeout)
+                    p = subprocess.Popen(test_command,
+                                        env=dict(os.environ.items() + testenv.items()),
+                                        stdin=my_stdin,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, close_fds=True)
+                    output = p.communicate()[0]
+                    status = p.returncode
+
+                    if re.search('slurmstepd: Munge decode failed: Expired credential', output, re.IGNORECASE) != None:
+                        launcher_error = 'Jira 18 -- Expired slurm credential for'
+                    elif re.search('output file from job .* does not exist', output, re.IGNORECASE) != None:
+                        launcher_error = 'Jira 17 -- Missing output file for'
+                    elif (re.search('PBS: job killed: walltime', output, re.IGNORECASE) != None or
+                          re.search('slurm.* CANCELLED .* DUE TO TIME LIMIT', output, re.IGNORECASE) != None):
+                        exectimeout = True
+                        launcher_error = 'Timed out executing program'
+
+                    if launcher_error:
+                        sys.stdout.write('%s[Error: %s %s/%s'%
+                                        (futuretest, launcher_error, localdir, test_filename))
+                        printTestVariation(compoptsnum, compoptslist,
+                                           execoptsnum, execoptslist);
+                        sys.stdout.write(']\n')
+                        sys.stdout.write('[Execution output was as follows:]\n')
+                        sys.stdout.write(trim_output(output))
+
+                else:
+                    if redirectin == None:
+                        my_stdin = sys.stdin
+                    else:
+                        my_stdin = file(redirectin, 'r')
+                    if useTimedExec:
+                        wholecmd = cmd+' '+' '.join(map(ShellEscape, args))
+                        p = subprocess.Popen([timedexec, str(timeout), wholecmd],
+                                            env=dict(os.environ.items() + testenv.items()),
+                                            stdin=my_stdin,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.STDOUT, close_fds=True)
+                        output = p.communicate()[0]
+                        status = p.returncode
+                    else:
+                        # stream the output to execlog (after anything a
+                        # .preexec wrote to it), keeping only its start and
+                        # end for the messages below
+                        with open(execlog, 'a') as execlogfile:
+                            p = supervise.popen(shlex.split(cmd)+args,
+                                                env=dict(os.environ.items() + testenv.items()),
+                                                stdin=my_stdin)
+                            child = supervisor.run(p, timeout, killtimeout,
+                                                   execlogfile, maxExecOutput)
+                        output = child.output
+                        status = child.status
+                        outputLogged = True
+
+                    if status == supervise.TIMEOUT_STATUS:
+                        exectimeout = True
+                        sys.stdout.write('%s[Error: Timed out executing program %s/%s'%
+                                        (futuretest, localdir, test_filename))
+                        printTestVariation(compoptsnum, compoptslist,
+                                           execoptsnum, execoptslist);
+                        sys.stdout.write(']\n')
+                        sys.stdout.write('[Execution output was as follows:]\n')
+                        sys.stdout.write(trim_output(output))
+                    else:
+                        # for perf runs print out the 5 processes with the
+                        # highest cpu usage. This should help identify if other
+                        # processes might have interfered with a test.
+                        if perftest:
+                            print('[Reporting processes with top 5 highest cpu usages]')
+                            sys.stdout.flush()
+                            psCom = 'ps ax -o user,pid,pcpu,command '
+                            sys.stdout.write(subprocess.Popen(psCom + '| head -n 1', shell=True,
+                                stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+                            sys.stdout.write(subprocess.Popen(psCom + '| tail -n +2 | sort -r -k 3 | head -n 5', shell=True,
+                                stdout=subprocess.PIPE, close_fds=True).communicate()[0])
+
+
+                elapsedExecTime = time.time() - execStart
+                test_name = os.path.join(localdir, test_filename)
+                compExecStr = ''
+                if compoptsnum != 0:
+                    compExecStr += 'compopts: {0} '.format(compoptsnum)
+                if execoptsnum != 0:
+                    compExecStr += 'execopts: {0}'.format(execoptsnum)
+                if compExecStr:
+                    test_name += ' ({0})'.format(compExecStr.strip())
+
+                if launchcmd and os.path.exists(launchcmd_exec_time_file):
+                    with open(launchcmd_exec_time_file, 'r') as fp:
+                        try:
+                            launchcmd_exec_time = float(fp.read())
+                            print('[launchcmd reports elapsed execution time '
+                                'for "{0}" - {1:.3f} seconds]'
+                                .format(test_name, launchcmd_exec_time))
+                        except ValueError:
+                            print('Could not parse launchcmd time file '
+                                '{0}'.format(launchcmd_exec_time_file))
+                    os.unlink(launchcmd_exec_time_file)
+
+                print('[Elapsed execution time for "{0}" - {1:.3f} '
+                    'seconds]'.format(test_name, elapsedExecTime))
+
+                if execTimeWarnLimit and elapsedExcTime > execTimeWarnLimit:
+                    sys.stdout.write('[Warning: %s/%s took over %.0f seconds to '
+                        'execute]\n' %(localdir, test_filename, execTimeWarnLimit))
+
+                # Sadly the scripts used below require an actual file
+                with open(execlog, 'a') as execlogfile:
+                    if not outputLogged:
+                        execlogfile.write(output)
+                    if catfiles:
+                        sys.stdout.write('[Concatenating extra files: %s]\n'%
+                                        (test_filename+'.catfiles'))
+                        sys.stdout.flush()
+                        execlogfile.flush()
+                        subprocess.Popen(['cat']+catfiles.split(),
+                                         stdout=execlogfile,
+                                         stderr=subprocess.STDOUT, close_fds=True).wait()
+
+                if not exectimeout and not launcher_error:
+                    if systemPrediff:
+                        sys.stdout.write('[Executing system-wide prediff]\n')
+                        sys.stdout.flush()
+                        sys.stdout.write(subprocess.Popen([systemPrediff,
+                                                          execname,execlog,compiler,
+                                                          ' '.join(envCompopts)+
+                                                          ' '+compopts,
+                                                          ' '.join(args)],
+                                                          stdout=subprocess.PIPE, close_fds=True).
+                                        communicate()[0])
+
+                    if globalPrediff:
+                        sys.stdout.write('[Executing ./PREDIFF]\n')
+                        sys.stdout.flush()
+                        sys.stdout.write(subprocess.Popen(['./PREDIFF',
+                                                          execname,execlog,compiler,
+                                                          ' '.join(envCompopts)+
+                                                          ' '+compopts,
+                                                          ' '.join(args)],
+                                                          stdout=subprocess.PIPE, close_fds=True).
+                                        communicate()[0])
+
+                    if prediff:
+                        sys.stdout.write('[Executing prediff ./%s]\n'%(prediff))
+                        sys.stdout.flush()
+                        sys.stdout.write(subprocess.Popen(['./'+prediff,
+                                                          execname,execlog,compiler,
+                                                          ' '.join(envCompopts)+
+                                                          ' '+compopts,
+                                                          ' '.join(args)],
+                                                          stdout=subprocess.PIPE, close_fds=True).
+                                        communicate()[0])
+
+                    # the scripts could have made the .good file
+                    if systemPrediff or globalPrediff or prediff:
+                        fileIndex.refresh()
+
+                    if not perftest:
+                        # find the good file 
+
+                        basename = test_filename
+                        commExecNum = ['']
+
+                        # if there were multiple compopts/execopts find the
+                        # .good file that corresponds to that run 
+                        if not onlyone:
+                            commExecNum.insert(0,'.'+str(compoptsnum)+'-'+str(execoptsnum))
+
+                        # if the .good file was explicitly specified, look for
+                        # that version instead of the multiple
+                        # compopts/execopts or just the base .good file 
+                        if explicitexecgoodfile != None:
+                            basename  = explicitexecgoodfile.replace('.good', '')
+                            commExecNum = ['']
+
+                        execgoodfile = FindGoodFile(basename, commExecNum)
+
+                        if not fileIndex.isfile(execgoodfile) or not fileIndex.access(execgoodfile, os.R_OK):
+                            sys.stdout.write('[Error cannot locate program output comparison file %s/%s]\n'%(localdir, execgoodfile))
+                            sys.stdout.write('[Execution output was as follows:]\n')
+                            sys.stdout.write(trim_output_file(execlog))
+
+                            continue # on to next execopts
+
+                        result = DiffFiles(execgoodfile, execlog)
+                        if result==0:
+                            os.unlink(execlog)
+                            sys.stdout.write('%s[Success '%(futuretest))
+                        else:
+                            sys.stdout.write('%s[Error '%(futuretest))
+                        sys.stdout.write('matching program output for %s/%s'%
+                                        (localdir, test_filename))
+                        if result!=0:
+                            printTestVariation(compoptsnum, compoptslist,
+                                               execoptsnum, execoptslist);
+                        sys.stdout.write(']\n')
+
+                        if (result != 0 and futuretest != ''):
+                            badfile=test_filename+'.bad'
+                            if fileIndex.access(badfile, os.R_OK):
+                                badresult = DiffFiles(badfile, execlog)
+                                if badresult==0:
+                                    os.unlink(execlog);
+                                    sys.stdout.write('[Clean match against .bad file ')
+                                else:
+                                    # bad file doesn't match, which is bad
+                                    sys.stdout.write('[Error matching .bad file ')
+                                sys.stdout.write('for %s/%s'%(localdir, test_filename))
+                                printTestVariation(compoptsnum, compoptslist);
+                                sys.stdout.write(']\n');
+
+
+                if perftest:
+                    if not os.path.isdir(perfdir) and not os.path.isfile(perfdir):
+                        os.makedirs(perfdir)
+                    if not os.access(perfdir, os.R_OK|os.X_OK):
+                        sys.stdout.write('[Error creating performance test directory %s]\n'%(perfdir))
+                        break # on to next compopts
+
+                    if explicitexecgoodfile==None:
+                        perfexecname = test_filename
+                        keyfile = PerfTFile(test_filename,'keys') #e.g. .perfkeys
+                    else:
+                        perfexecname = re.sub(r'\{0}$'.format(PerfSfx('keys')), '', explicitexecgoodfile)
+                        if fileIndex.isfile(explicitexecgoodfile):
+                            keyfile = explicitexecgoodfile
+                        else:
+                            keyfile = PerfTFile(test_filename,'keys')
+
+                    perfdate = os.getenv('CHPL_TEST_PERF_DATE')
+                    if perfdate == None:
+                        perfdate = datetime.date.today().strftime("%m/%d/%y")
+
+                    sys.stdout.write('[Executing %s/test/computePerfStats %s %s %s %s %s %s]\n'%(utildir, perfexecname, perfdir, keyfile, execlog, str(exectimeout), perfdate))
+                    sys.stdout.flush()
+
+                    status = computePerfStats.compute_perf_stats(
+                        perfexecname, perfdir, keyfile, execlog, exectimeout,
+                        perfdate)
+                    sys.stdout.flush()
+                    if not exectimeout and not launcher_error:
+                        if status == 0:
+                            os.unlink(execlog)
+                            sys.stdout.write('%s[Success '%(futuretest))
+                        else:
+                            sys.stdout.write('%s[Error '%(futuretest))
+                        sys.stdout.write('matching performance keys for %s/%s'%
+                                        (localdir, test_filename))
+                        if status!=0:
+                            printTestVariation(compoptsnum, compoptslist,
+                                               execoptsnum, execoptslist);
+                        sys.stdout.write(']\n')
+
+                    if exectimeout or status != 0:
+                        break
+
+        cleanup(execname)
+
+    del execoptslist
+    del compoptslist
+
+    elapsedCurFileTestTime = time.time() - curFileTestStart
+    test_name = os.path.join(localdir, test_filename)
+    print('[Elapsed time to compile and execute all versions of "{0}" - '
+        '{1:.3f} seconds]'.format(test_name, elapsedCurFileTestTime))
+
+
+# Run one test in a worker thread, returning its output and any exception
+def run_test_in_worker(testname):
+    sys.stdout.start()
+    try:
+        run_test(testname)
+        error = None
+    except BaseException:
+        error = sys.exc_info()
+    finally:
+        if executionTurns:
+            executionTurns.done(testname)
+    return (sys.stdout.stop(), error)
+
+def last_test_time(times, testname):
+    name = re.match(r'^(.*)\.(?:chpl|test\.c)$', testname).group(1)
+    return times.test_time(os.path.join(localdir, name))
+
+# Workers take the next test from a shared queue as soon as they are done with
+# their last one, so a few long tests don't hold up the rest of the directory.
+# Results come back in the original test order.  When pipelined, tests are
+# compiled side by side but executed one at a time.
+def run_tests_in_parallel(tests, jobs, pipelined=False):
+    global executionTurns
+    if pipelined:
+        # tests are started in order, so a worker waiting for its turn to
+        # execute only ever waits on tests that other workers already have
+        executionTurns = ExecutionTurns(tests)
+        order = tests
+    else:
+        # start the tests that took the longest last time first, but write
+        # their output in the usual order
+        times = test_times.TestTimes(os.getenv('CHPL_TEST_TIMES_FILE', '')).load()
+        order = test_times.longest_first(tests,
+                                         lambda t: last_test_time(times, t))
+    sys.stdout = TestOutput(sys.stdout)
+    pool = ThreadPool(jobs)
+    results = {}
+    for testname in order:
+        results[testname] = pool.apply_async(run_test_in_worker, (testname,))
+    for testname in tests:
+        # wait with a timeout so that ctrl-C still gets through
+        while not results[testname].ready():
+            results[testname].wait(1)
+        (output, error) = results[testname].get()
+        sys.stdout.write(output)
+        sys.stdout.flush()
+        if error:
+            break
+    # when run by start_test, the tests still running must be done before it
+    # moves on to the next directory
+    pool.close()
+    pool.join()
+    executionTurns = None
+    sys.stdout = sys.stdout.stream
+    if error:
+        raise error[0], error[1], error[2]
+
+def run_tests():
+    # Performance tests are timed, so they are always run one at a time
+    if testjobs > 1 and len(testsrc) > 1 and not perftest and not compperftest:
+        run_tests_in_parallel(testsrc, testjobs)
+    elif pipelinejobs > 1 and len(testsrc) > 1 and not perftest and not compperftest:
+        run_tests_in_parallel(testsrc, pipelinejobs, pipelined=True)
+    else:
+        for testname in testsrc:
+            run_test(testname)
+
+def run_directory(dir, config):
+    """Compile, execute and check the tests in a directory, writing the
+    results to sys.stdout. The environment is read the same way as when
+    sub_test is run as a command in that directory.
+
+    :type dir: str
+    :arg dir: directory to test
+
+    :type config: Config
+    :arg config: settings for the compiler to test with
+
+    :rtype: int
+    :returns: exit status of the sub_test command for the same directory
+    """
+    global sub_test_start_time
+    sub_test_start_time = time.time()
+    globals().update(vars(config))
+
+    cwd = os.getcwd()
+    pwd = os.environ.get('PWD')
+    os.chdir(dir)
+    os.environ['PWD'] = dir
+    try:
+        try:
+            set_up_directory()
+            run_tests()
+        finally:
+            elapsed_sub_test_time()
+    except SystemExit as e:
+        return e.code
+    finally:
+        os.chdir(cwd)
+        if pwd is None:
+            del os.environ['PWD']
+        else:
+            os.environ['PWD'] = pwd
+    return 0
+
+def main():
+    if len(sys.argv)!=2:
+        print 'usage: sub_test COMPILER'
+        sys.exit(0)
+    try:
+        config = Config(sys.argv[1])
+    except SystemExit:
+        elapsed_sub_test_time()
+        raise
+    try:
+        status = run_directory(os.getcwd(), config)
+    finally:
+        config.sharedBuilds.clear()
+    sys.exit(status)
+
+if __name__ == '__main__':
+    main()
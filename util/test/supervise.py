@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+
+"""Supervise the processes sub_test starts to compile and execute tests.
+
+One thread watches every child at once: it reads their output as it
+arrives, and once a child runs past its timeout it is sent SIGTERM,
+followed by SIGKILL if it is still running after its kill timeout. The
+threads that started the children just wait for them, so testing many
+directories or tests at once doesn't take a thread, or a polling loop,
+per child.
+
+This does what util/test/timedexec does without starting perl and a shell
+for every compile and execution. A child started with popen() leads its own
+process group, and the signals go to the whole group, so anything the test
+started goes too. Child.status follows the timedexec conventions: 222 for a
+timeout, and 1 for a child killed by a signal. The messages timedexec
+writes are added to the output, since .good and .prediff files match on
+them.
+
+A child's output can instead be written to a file as it arrives, with a
+limit on how much is written, so that a test that prints a lot doesn't
+have to fit in memory. Only the start and end of it are then kept.
+
+Python 2 has no selectors module, so the loop uses select directly.
+"""
+
+from __future__ import print_function
+
+import errno
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# how often to check on a child that has closed its output but not exited
+_exit_poll_interval = 0.01
+
+# the exit status timedexec uses for a timeout
+TIMEOUT_STATUS = 222
+
+# bytes kept from each end of output that is written to a file
+PREVIEW_SIZE = 128 * 1024
+
+
+def popen(args, **kwargs):
+    """Start a process to supervise, in its own process group, with its
+    stdout and stderr going to one pipe. Other arguments are passed on to
+    subprocess.Popen.
+
+    Python 2 leaves pipes open across exec, so without close_fds a child
+    would hold the pipes of the children other threads started, and their
+    output wouldn't end until it exited.
+
+    :type args: list
+    :arg args: command line
+
+    :rtype: subprocess.Popen
+    """
+    return subprocess.Popen(args, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, preexec_fn=os.setpgrp,
+                            close_fds=True, **kwargs)
+
+
+class Child(object):
+    """A process being supervised."""
+
+    def __init__(self, process, timeout, kill_timeout, sink=None,
+                 limit=None):
+        self.process = process
+        self.fd = process.stdout.fileno()
+        self.deadline = time.time() + timeout
+        self.kill_timeout = kill_timeout
+        self.kill_deadline = None
+        # when to stop waiting for the child to go after SIGKILL
+        self.reap_deadline = None
+        self.timed_out = False
+        self.core_dumped = False
+        self.eof = False
+        try:
+            self.group = os.getpgid(process.pid) == process.pid
+        except OSError:
+            self.group = False
+        self.chunks = []
+        self.sink = sink
+        self.limit = limit
+        self.written = 0
+        self.dropped = 0
+        self.head_size = 0
+        self.tail = ''
+        # what stopped the supervisor, if it failed while watching the child
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def output(self):
+        """Everything the child wrote before it exited or was killed. For a
+        child whose output went to a file, this is only its first and last
+        PREVIEW_SIZE bytes, or all of it if it was shorter than that.
+        """
+        return ''.join(self.chunks) + self.tail
+
+    @property
+    def status(self):
+        """Exit status, with the meanings it has for timedexec."""
+        if self.timed_out:
+            return TIMEOUT_STATUS
+        if self.process.returncode < 0:
+            return 1
+        return self.process.returncode
+
+    @property
+    def truncated(self):
+        """Whether output was left out of the file because of the limit."""
+        return self.dropped > 0
+
+    def append(self, data):
+        """Add to the output.
+
+        :type data: str
+        :arg data: what the child wrote
+        """
+        if self.sink is None:
+            self.chunks.append(data)
+            return
+        dropped = self.dropped
+        if self.limit is not None and self.written + len(data) > self.limit:
+            room = max(self.limit - self.written, 0)
+            self.dropped += len(data) - room
+            data = data[:room]
+        self.sink.write(data)
+        self.written += len(data)
+        self._keep(data)
+        if self.dropped and not dropped:
+            self.note('\n[Output truncated after {0} bytes]\n'
+                      .format(self.limit))
+
+    def note(self, message):
+        """Add a message of the supervisor's to the output. It isn't
+        subject to the limit.
+
+        :type message: str
+        :arg message: message text
+        """
+        if self.sink is None:
+            self.chunks.append(message)
+        else:
+            self.sink.write(message)
+            self._keep(message)
+
+    def _keep(self, data):
+        # keep the first and last PREVIEW_SIZE bytes of streamed output
+        if self.head_size < PREVIEW_SIZE:
+            head = data[:PREVIEW_SIZE - self.head_size]
+            self.chunks.append(head)
+            self.head_size += len(head)
+            data = data[len(head):]
+        if data:
+            self.tail = (self.tail + data)[-PREVIEW_SIZE:]
+
+    def wait(self):
+        """Wait until the child has exited or been killed.
+
+        :rtype: Child
+        :returns: self
+
+        :raises: the error that stopped the supervisor, if it failed before
+                 the child was done
+        """
+        # wait with a timeout so that ctrl-C still gets through
+        try:
+            while not self.done.is_set():
+                self.done.wait(1)
+        except KeyboardInterrupt:
+            # a child in its own process group doesn't see ctrl-C
+            _kill(self, signal.SIGTERM)
+            raise
+        if self.error:
+            raise self.error[0], self.error[1], self.error[2]
+        return self
+
+
+class Supervisor(object):
+    """Watches the output and timeouts of any number of children."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.children = []
+        self.thread = None
+        (self.wake_fd, self.notify_fd) = os.pipe()
+
+    def start(self, process, timeout, kill_timeout, sink=None, limit=None):
+        """Start supervising a process.
+
+        :type process: subprocess.Popen
+        :arg process: process whose stdout is a pipe; stderr should be
+                      sent to the same pipe or discarded
+
+        :type timeout: int
+        :arg timeout: seconds the process may run before it is killed
+
+        :type kill_timeout: int
+        :arg kill_timeout: seconds between SIGTERM and SIGKILL
+
+        :type sink: file
+        :arg sink: if given, the output is written to this as it arrives,
+                   instead of being kept
+
+        :type limit: int
+        :arg limit: if given, bytes of output to write to sink; the rest is
+                    read and thrown away, and a note is written in its place
+
+        :rtype: Child
+        :returns: child to wait for
+        """
+        child = Child(process, timeout, kill_timeout, sink, limit)
+        with self.lock:
+            self.children.append(child)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop)
+                self.thread.daemon = True
+                self.thread.start()
+        os.write(self.notify_fd, 'x')
+        return child
+
+    def run(self, process, timeout, kill_timeout, sink=None, limit=None):
+        """Supervise a process until it exits or is killed. The arguments
+        are the same as for start().
+
+        :rtype: Child
+        :returns: the finished child; its timed_out is True if it was killed
+        """
+        return self.start(process, timeout, kill_timeout, sink, limit).wait()
+
+    def _loop(self):
+        # the children of a loop that fails fail with it, rather than being
+        # waited for forever
+        try:
+            while True:
+                self._step()
+        except Exception:
+            self._fail(sys.exc_info())
+
+    def _step(self):
+        # look at each child, then wait for output or the next timeout
+        with self.lock:
+            children = list(self.children)
+
+        now = time.time()
+        wait = None
+        for child in children:
+            next_event = self._check(child, now)
+            if next_event is not None:
+                wait = next_event if wait is None else min(wait, next_event)
+
+        fds = [self.wake_fd] + [c.fd for c in children
+                                if not c.eof and not c.done.is_set()]
+        try:
+            readable = select.select(fds, [], [], wait)[0]
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                return
+            raise
+
+        for fd in readable:
+            if fd == self.wake_fd:
+                os.read(self.wake_fd, 4096)
+                continue
+            child = next(c for c in children if c.fd == fd)
+            data = os.read(fd, 65536)
+            if data:
+                child.append(data)
+            else:
+                child.eof = True
+
+    def _fail(self, error):
+        # the loop can't go on: kill the children it was watching, and have
+        # whoever waits for them get the error. The next child started gets
+        # a new loop
+        with self.lock:
+            children = self.children
+            self.children = []
+            self.thread = None
+        for child in children:
+            child.error = error
+            try:
+                _kill(child, signal.SIGKILL)
+                child.process.stdout.close()
+            except (IOError, OSError):
+                pass
+            child.done.set()
+
+    def _check(self, child, now):
+        # act on a child's state, returning the seconds until it next needs
+        # attention, or None if it only needs to be looked at again when it
+        # writes something
+        if child.eof and _exited(child):
+            self._finish(child)
+            return None
+        if child.reap_deadline is not None:
+            # killed; reap it once it's gone, without holding up the other
+            # children. One stuck in the kernel is given up on in the end
+            if _exited(child) or now >= child.reap_deadline:
+                self._finish(child)
+                return None
+            return min(_exit_poll_interval, child.reap_deadline - now)
+        if child.timed_out:
+            if now >= child.kill_deadline:
+                # use the big hammer, which the child can't ignore
+                child.note('timedexec sending SIGKILL\n')
+                _kill(child, signal.SIGKILL)
+                child.reap_deadline = now + child.kill_timeout
+                return _exit_poll_interval
+            if child.eof:
+                return min(_exit_poll_interval, child.kill_deadline - now)
+            return child.kill_deadline - now
+        if now >= child.deadline:
+            child.timed_out = True
+            child.kill_deadline = now + child.kill_timeout
+            child.note('timedexec Alarm Clock\n'
+                       'timedexec sending SIGTERM\n')
+            _kill(child, signal.SIGTERM)
+            return _exit_poll_interval
+        if child.eof:
+            return min(_exit_poll_interval, child.deadline - now)
+        return child.deadline - now
+
+    def _finish(self, child):
+        with self.lock:
+            self.children.remove(child)
+        if not child.timed_out and child.process.returncode < 0:
+            child.note(
+                'timedexec: target program died with signal {0}, {1} '
+                'coredump\n'.format(-child.process.returncode,
+                                     'with' if child.core_dumped else 'without'))
+        child.process.stdout.close()
+        child.done.set()
+
+
+def _exited(child):
+    # reap the child if it has exited, noting whether it dumped core, which
+    # Popen.poll() doesn't say
+    process = child.process
+    if process.returncode is not None:
+        return True
+    try:
+        (pid, status) = os.waitpid(process.pid, os.WNOHANG)
+    except OSError as e:
+        if e.errno != errno.ECHILD:
+            raise
+        return process.poll() is not None
+    if pid == 0:
+        return False
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+        child.core_dumped = os.WCOREDUMP(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    return True
+
+
+def _kill(child, sig):
+    try:
+        if child.group:
+            os.killpg(child.process.pid, sig)
+        else:
+            os.kill(child.process.pid, sig)
+    except OSError as e:
+        # it has already exited
+        if e.errno != errno.ESRCH:
+            raise
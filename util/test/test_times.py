@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""Record how long tests and test directories took to run, so that parallel
+runs of start_test can start the longest ones first.
+
+The timing database is a JSON file holding the most recent elapsed time of
+each test and each directory, keyed by the name used in the start_test log
+(the path relative to the test directory).
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import re
+import tempfile
+
+_test_time_pattern = re.compile(
+    r'^\[Elapsed time to compile and execute all versions of "(?P<name>[^"]+)"'
+    r' - (?P<time>\d+\.\d+) seconds\]')
+_directory_time_pattern = re.compile(
+    r'^\[Finished subtest "(?P<name>[^"]+)" - (?P<time>\d+\.\d+) seconds\]')
+
+
+class TestTimes(object):
+    """Elapsed times of tests and directories from earlier runs."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.tests = {}
+        self.directories = {}
+
+    def load(self):
+        """Read the timing database, if there is one. A missing or unreadable
+        database is treated as empty since it is only used for scheduling.
+        """
+        try:
+            with open(self.filename, 'r') as fp:
+                data = json.load(fp)
+            self.tests = data.get('tests', {})
+            self.directories = data.get('directories', {})
+        except (IOError, OSError, ValueError):
+            self.tests = {}
+            self.directories = {}
+        return self
+
+    def save(self):
+        """Write the timing database, replacing the old one atomically so
+        that concurrent runs never see a partial file.
+        """
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp_name = tempfile.mkstemp(prefix='.test-times.', dir=dirname)
+        with os.fdopen(fd, 'w') as fp:
+            json.dump({'tests': self.tests, 'directories': self.directories},
+                      fp, indent=0, sort_keys=True)
+        os.rename(tmp_name, self.filename)
+
+    def update_from_log(self, log_file):
+        """Record the elapsed times found in a start_test log.
+
+        :type log_file: str
+        :arg log_file: start_test log filename
+
+        :rtype: int
+        :returns: number of times recorded
+        """
+        count = 0
+        with open(log_file, 'r') as fp:
+            for line in fp:
+                match = _test_time_pattern.match(line)
+                if match:
+                    self.tests[match.group('name')] = float(match.group('time'))
+                    count += 1
+                    continue
+                match = _directory_time_pattern.match(line)
+                if match:
+                    self.directories[match.group('name')] = float(
+                        match.group('time'))
+                    count += 1
+        return count
+
+    def test_time(self, name):
+        """Return the last elapsed time of a test, or 0.0 if it is unknown."""
+        return self.tests.get(name, 0.0)
+
+    def directory_time(self, name):
+        """Return the last elapsed time of a directory, or 0.0 if it is
+        unknown.
+        """
+        return self.directories.get(name, 0.0)
+
+
+def longest_first(items, get_time):
+    """Return items sorted so that the ones that took the longest last time
+    come first. Items without a recorded time keep their original order after
+    the ones that have one.
+
+    :type items: list
+    :arg items: things to be scheduled
+
+    :type get_time: function
+    :arg get_time: returns the last elapsed time of an item
+    """
+    return sorted(items, key=get_time, reverse=True)
+
+
+def default_file(logs_dir):
+    """Return the timing database to use for a given Logs/ directory, which
+    can be overridden with CHPL_TEST_TIMES_FILE.
+    """
+    return os.environ.get('CHPL_TEST_TIMES_FILE',
+                          os.path.join(logs_dir, '.test-times.json'))